@@ -1,6 +1,7 @@
 import os
 import pydantic
 import pydantic_settings
+import typing
 
 
 
@@ -14,3 +15,94 @@ class Settings(pydantic_settings.BaseSettings):
 
     OPENAI_API_TOKEN: pydantic.SecretStr
     TELEGRAM_TOKEN: pydantic.SecretStr
+
+    CLASSIFIER_MODEL_PATH: typing.Optional[str] = None
+    CLASSIFIER_THRESHOLD: float = 0.9
+    CLASSIFIER_LOG_PATH: typing.Optional[str] = None
+    COMBINED_NODES: list[str] = []
+    SPECULATIVE_NODES: list[str] = []
+    SPECULATION_TTL: float = 600.0
+
+    STREAMING: bool = False
+    STREAMING_EDIT_INTERVAL: float = 1.0
+
+    CHECKPOINT_BACKEND: typing.Literal['memory', 'sqlite'] = 'memory'
+    CHECKPOINT_PATH: str = 'checkpoints.sqlite'
+    CHECKPOINT_TTL: float = 7 * 24 * 3600
+    CHECKPOINT_KEEP: int = 4
+
+    SESSIONS_MAX: int = 10_000
+    SESSIONS_TTL: float = 24 * 3600
+
+    MODE: typing.Literal['polling', 'webhook'] = 'polling'
+    WEBHOOK_URL: typing.Optional[str] = None
+    WEBHOOK_PATH: str = '/webhook'
+    WEBHOOK_HOST: str = '0.0.0.0'
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: typing.Optional[pydantic.SecretStr] = None
+    WORKERS_CONCURRENCY: int = 64
+    WORKERS_MAX_PENDING: int = 1000
+    WORKERS_COALESCE: bool = True
+    TELEGRAM_API_URL: typing.Optional[str] = None
+
+    SHARDS: int = 1
+    SHARD: typing.Optional[int] = None
+    SHARD_SOCKET_DIR: str = '/tmp/smartdeal-shards'
+
+    DRAIN_TIMEOUT: float = 25.0
+    STATE_SNAPSHOT_PATH: typing.Optional[str] = None
+
+    CAMPAIGN_PATH: typing.Optional[str] = None
+    CAMPAIGN_PROGRESS_PATH: typing.Optional[str] = None
+    CAMPAIGN_RATE: float = 25.0
+    CAMPAIGN_BURST: int = 25
+    CAMPAIGN_CHAT_RATE: float = 1.0
+    CAMPAIGN_BATCH: int = 25
+
+    DEBOUNCE_WINDOW: float = 0.3
+
+    JOBS_CONCURRENCY: int = 64
+    JOBS_JOURNAL_PATH: typing.Optional[str] = None
+    JOBS_TYPING_DELAY: float = 0.5
+    JOBS_TYPING_INTERVAL: float = 4.0
+
+    CACHE_SIZE: int = 10_000
+    CACHE_TTL: float = 24 * 3600
+    CACHE_PATH: typing.Optional[str] = None
+    CACHE_DISK_SIZE: int = 100_000
+
+    OPENAI_BASE_URL: typing.Optional[str] = None
+    LLM_MODEL: str = 'gpt-4'
+    LLM_ROUTES: dict[str, str] = {}
+    LLM_ROUTE_TIMEOUT: dict[str, float] = {}
+    LLM_ROUTE_CONCURRENCY: dict[str, int] = {}
+    LLM_EVAL_MODEL: typing.Optional[str] = None
+    LLM_EVAL_RATE: float = 0.05
+    LLM_EVAL_LOG_PATH: typing.Optional[str] = 'llm_eval.jsonl'
+    LLM_TIMEOUT: float = 60.0
+    LLM_CONCURRENCY: int = 16
+    LLM_RATE: float = 0.0
+    LLM_BURST: int = 10
+    LLM_RETRIES: int = 3
+    LLM_BACKOFF: float = 0.5
+    LLM_BREAKER_THRESHOLD: int = 5
+    LLM_BREAKER_COOLDOWN: float = 30.0
+    LLM_FALLBACK_MESSAGE: str = 'Thank you for your message! Our manager will get back to you shortly.'
+
+    LOG_LEVEL: str = 'INFO'
+
+    METRICS_PORT: typing.Optional[int] = None
+    METRICS_HOST: str = '0.0.0.0'
+
+    TRACE_PATH: typing.Optional[str] = None
+    TRACE_SAMPLE_RATE: float = 1.0
+
+    FSM_STORAGE: typing.Literal['memory', 'sqlite', 'redis'] = 'memory'
+    FSM_STORAGE_PATH: str = 'fsm.sqlite'
+    FSM_REDIS_URL: str = 'redis://localhost:6379/0'
+    FSM_POOL_SIZE: int = 8
+
+    PROMPT_MESSAGE_BUDGET: int = 512
+    PROMPT_TOKENIZER: typing.Optional[str] = 'cl100k_base'
+
+    PRICING_POLICY: dict[str, typing.Any] = {}
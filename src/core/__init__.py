@@ -1,2 +1,25 @@
-from .handlers import handle_command_scenario, handle_command_start, handle_message_text, handle_input_cpm, handle_input_views
-from .services import Engine
\ No newline at end of file
+import importlib
+
+
+exports = {
+    'handle_command_scenario': '.handlers',
+    'handle_command_start': '.handlers',
+    'handle_message_text': '.handlers',
+    'handle_input_cpm': '.handlers',
+    'handle_input_views': '.handlers',
+    'Engine': '.services'
+}
+
+__all__ = list(exports)
+
+
+def __getattr__(name):
+    if name in ('handlers', 'services'):
+        return importlib.import_module(f'.{name}', __name__)
+
+    if name not in exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = globals()[name] = getattr(importlib.import_module(exports[name], __name__), name)
+
+    return value
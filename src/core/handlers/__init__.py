@@ -1,4 +1,4 @@
-from .handle_command_scenario import handle_command_scenario
+from .handle_command_scenario import handle_command_scenario, pitch
 from .handle_message_text import handle_message_text
 from .handle_command_start import handle_command_start
 from .handle_input_data import handle_input_cpm, handle_input_views
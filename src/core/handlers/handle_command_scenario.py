@@ -1,14 +1,13 @@
 import aiogram
+import logging
 
 
 
-async def handle_command_scenario(message: aiogram.types.Message, state: aiogram.fsm.context.FSMContext, engine):
+logger = logging.getLogger(__name__)
 
-	try:
 
-		await engine.reset(message.from_user.id)
 
-		await message.answer("""
+pitch = """
 		I'm Dasha from Dream X-Company, where we connect outstanding creators like you with top-tier brands for impactful collaborations. Hope this message finds you well!
 
 		We've been following your YouTube journey, and are impressed by your unique ability to connect with your audience. That's why we're thrilled to pitch with you an exciting partnership opportunity with Dream X-Company!
@@ -24,10 +23,21 @@ async def handle_command_scenario(message: aiogram.types.Message, state: aiogram
 		If you're interested, please let us know your rate for the specified format and which release dates work for you.
 
 		Looking forward to hearing your thoughts.
-		""")
+		"""
+
+
+
+async def handle_command_scenario(message: aiogram.types.Message, state: aiogram.fsm.context.FSMContext, engine):
+
+	try:
+
+		await engine.reset(message.from_user.id)
+
+		await message.answer(pitch)
 
 		return {'handler': 'handle_command_scenario'}
 
-	except Exception as exception:
+	except Exception:
 
+		logger.exception('Scenario command failed for user %s', message.from_user.id)
 		await message.answer('Oops! Something is wrong.')
\ No newline at end of file
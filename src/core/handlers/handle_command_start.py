@@ -1,4 +1,9 @@
 import aiogram
+import logging
+
+
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -9,7 +14,7 @@ async def handle_command_start(message: aiogram.types.Message, state: aiogram.fs
         await message.answer("Hello, I'm smart deal bot, please send me your preferred cpm!")
         return {'handler': 'handle_command_start'}
 
-    except Exception as exception:
+    except Exception:
 
-        print(exception)
+        logger.exception('Start command failed for user %s', message.from_user.id)
         await message.answer('Oops! Something is wrong.')
\ No newline at end of file
@@ -1,18 +1,64 @@
 import aiogram
-import asyncio
+import logging
+
+from ..services.streaming import StreamingMessage
+
+
+
+logger = logging.getLogger(__name__)
 
 
 
 async def handle_message_text(message: aiogram.types.Message, state: aiogram.fsm.context.FSMContext, engine):
 
 	try:
-		state_data = await state.get_data()
-		response = await engine.query(state_data, message.from_user.id)
-		await message.answer(response.get('message', '__no_message__'))
+		text = await engine.debouncer.collect(message.chat.id, message.text)
+
+		if text is None:
+
+			return {'handler': 'handle_message_text', 'coalesced': True}
+
+		async with engine.debouncer.lock(message.chat.id):
+
+			state_data = await state.get_data()
+			state_data['message'] = text
+
+			if engine.settings.STREAMING:
+
+				response = await engine.jobs.run('query', message.from_user.id, lambda: stream_message_text(message, state_data, engine), message.model_copy(update = {'text': text}))
+
+			else:
+
+				response = await engine.jobs.run('query', message.from_user.id, lambda: engine.query(state_data, message.from_user.id), message.model_copy(update = {'text': text}))
+				await message.answer(response.get('message', '__no_message__'))
 
 		return {'handler': 'handle_message_text'}
 
-	except Exception as exception:
+	except Exception:
+
+		logger.exception('Message handling failed for user %s', message.from_user.id)
+		await message.answer('Oops! Something is wrong.')
+
+async def stream_message_text(message: aiogram.types.Message, state_data, engine):
+
+	reply = StreamingMessage(await message.answer('…'), engine.throttle)
+
+	async for kind, payload in engine.query_stream(state_data, message.from_user.id):
+
+		match kind:
+
+			case 'reset':
+
+				reply.reset()
+
+			case 'token':
+
+				await reply.feed(payload)
+
+			case 'values':
+
+				response = payload
+
+	await reply.close(response.get('message', '__no_message__'))
 
-		print(exception)
-		await message.answer('Oops! Something is wrong.')
\ No newline at end of file
+	return response
\ No newline at end of file
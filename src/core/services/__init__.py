@@ -1 +1,33 @@
-from .engine import Engine
+import importlib
+
+
+exports = {
+    'Engine': '.engine',
+    'Extractor': '.extractors',
+    'ChatWorkerPool': '.workers',
+    'JobQueue': '.jobs',
+    'Campaign': '.campaign',
+    'PooledRequestHandler': '.webhook',
+    'HashRing': '.sharding',
+    'ShardServer': '.sharding',
+    'Supervisor': '.sharding',
+    'MetricsRegistry': '.metrics',
+    'HandlerMetricsMiddleware': '.metrics',
+    'Tracer': '.tracing',
+    'HandlerTracingMiddleware': '.tracing',
+    'MemoryRecordStorage': '.storages',
+    'SQLiteRecordStorage': '.storages',
+    'RedisRecordStorage': '.storages',
+    'ScopedDispatcher': '.storages'
+}
+
+__all__ = list(exports)
+
+
+def __getattr__(name):
+    if name not in exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = globals()[name] = getattr(importlib.import_module(exports[name], __name__), name)
+
+    return value
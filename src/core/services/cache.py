@@ -0,0 +1,96 @@
+import asyncio
+import collections
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class ResponseCache:
+
+    def __init__(self, maxsize: int, ttl: float, path: Optional[str] = None, disk_maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_maxsize = disk_maxsize
+        self.memory = collections.OrderedDict()
+        self.counters = collections.Counter()
+        self.connection = None
+
+        if path:
+            self.lock = threading.Lock()
+            self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)')
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        normalized = re.sub(r'\s+', ' ', prompt).strip().casefold()
+        return hashlib.sha256(f'{model}\x00{normalized}'.encode()).hexdigest()
+
+    def rate(self) -> float:
+        total = self.counters['memory'] + self.counters['disk'] + self.counters['miss']
+        return (self.counters['memory'] + self.counters['disk']) / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {**self.counters, 'size': len(self.memory), 'rate': self.rate()}
+
+    def _execute(self, query, parameters=()):
+        with self.lock:
+            return self.connection.execute(query, parameters).fetchall()
+
+    def _remember(self, key, value, expires):
+        if not self.maxsize:
+            return
+
+        self.memory[key] = (value, expires)
+        self.memory.move_to_end(key)
+
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        value, expires = self.memory.get(key, (None, 0.0))
+
+        if value is not None and expires > time.time():
+            self.memory.move_to_end(key)
+            self.counters['memory'] += 1
+            return value
+
+        self.memory.pop(key, None)
+
+        if self.connection is not None:
+            rows = await asyncio.to_thread(
+                self._execute, 'SELECT value, expires FROM responses WHERE key = ? AND expires > ?', (key, time.time())
+            )
+
+            if rows:
+                self._remember(key, *rows[0])
+                self.counters['disk'] += 1
+                return rows[0][0]
+
+        self.counters['miss'] += 1
+
+    async def set(self, key: str, value: str):
+        expires = time.time() + self.ttl
+        self._remember(key, value, expires)
+
+        if self.connection is not None:
+            await asyncio.to_thread(
+                self._execute, 'INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)', (key, value, expires)
+            )
+            self.counters['writes'] += 1
+
+            if self.counters['writes'] % 1000 == 0:
+                await asyncio.to_thread(self._prune)
+
+    def _prune(self):
+        self._execute('DELETE FROM responses WHERE expires <= ?', (time.time(),))
+        self._execute(
+            'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.disk_maxsize,)
+        )
@@ -0,0 +1,207 @@
+import asyncio
+import collections
+import contextlib
+import csv
+import dataclasses
+import json
+import logging
+import os
+import time
+from decimal import InvalidOperation
+from typing import Callable, Optional
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+from aiogram.fsm.storage.base import StorageKey
+
+from .limiters import TokenBucket
+from .pricing import number
+from .storages import RecordStorage
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('chat_id', 'client_cpm', 'min_views', 'max_views')
+
+# outcomes worth another attempt when the campaign is started again
+RETRIED = ('failed',)
+
+
+@dataclasses.dataclass(frozen=True)
+class Target:
+    chat_id: int
+    client_cpm: str
+    min_views: str
+    max_views: str
+
+
+def load(path: str) -> list:
+    targets = {}
+
+    with open(path, encoding='utf-8', newline='') as file:
+        reader = csv.DictReader(file)
+        missing = [column for column in COLUMNS if column not in (reader.fieldnames or ())]
+
+        if missing:
+            raise ValueError(f'{path} has no {", ".join(missing)} column')
+
+        for row in reader:
+            try:
+                values = [row[column].strip() for column in COLUMNS[1:]]
+
+                for value in values:
+                    number(value)
+
+                target = Target(int(row['chat_id']), *values)
+
+            except (AttributeError, ValueError, InvalidOperation) as error:
+                raise ValueError(f'{path}, line {reader.line_num}: {error!r}') from None
+
+            # one pitch per chat, the last row for a chat wins
+            targets[target.chat_id] = target
+
+    return list(targets.values())
+
+
+class Campaign:
+
+    def __init__(
+        self,
+        path: str,
+        bot,
+        storage,
+        engine,
+        text: str,
+        progress_path: Optional[str] = None,
+        rate: float = 25.0,
+        burst: int = 25,
+        chat_rate: float = 1.0,
+        batch: int = 25,
+        retries: int = 3,
+        backoff: float = 1.0,
+        owned: Optional[Callable] = None,
+        metrics=None
+    ):
+        self.path = path
+        self.bot = bot
+        self.storage = storage
+        self.engine = engine
+        self.text = text
+        self.progress_path = progress_path or path + '.progress.jsonl'
+        self.bucket = TokenBucket(rate, burst)
+        self.chat_rate = chat_rate
+        self.batch = batch
+        self.retries = retries
+        self.backoff = backoff
+        self.owned = owned
+        self.metrics = metrics
+        self.resume_at = 0.0
+        self.counters = collections.Counter()
+
+    def progress(self) -> dict:
+        outcomes = {}
+
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding='utf-8') as file:
+                for line in file:
+                    with contextlib.suppress(ValueError, KeyError):
+                        record = json.loads(line)
+                        outcomes[record['chat_id']] = record['outcome']
+
+        return outcomes
+
+    async def seed(self, targets: list):
+        scope = self.storage.batch() if isinstance(self.storage, RecordStorage) else contextlib.nullcontext()
+
+        # private chats only: the influencer's user id is the chat id
+        async with scope:
+            for target in targets:
+                key = StorageKey(bot_id=self.bot.id, chat_id=target.chat_id, user_id=target.chat_id)
+                await self.storage.set_state(key, None)
+                await self.storage.update_data(key, {
+                    'client_cpm': target.client_cpm,
+                    'min_views': target.min_views,
+                    'max_views': target.max_views,
+                    'influencer_price': '0'
+                })
+
+        for target in targets:
+            await self.engine.reset(target.chat_id)
+
+    async def _paused(self):
+        loop = asyncio.get_running_loop()
+
+        while (delay := self.resume_at - loop.time()) > 0:
+            await asyncio.sleep(delay)
+
+    async def send(self, target: Target) -> str:
+        # rows are unique per chat, so the chat's bucket only spaces out retries
+        bucket = TokenBucket(self.chat_rate, 1)
+
+        for attempt in range(self.retries + 1):
+            await self._paused()
+            await self.bucket.acquire()
+            await bucket.acquire()
+
+            try:
+                await self.bot.send_message(chat_id=target.chat_id, text=self.text)
+                return 'sent'
+
+            except TelegramRetryAfter as error:
+                # flood control is per bot, so every sender waits it out
+                self.counters['retry_after'] += 1
+                self.resume_at = max(self.resume_at, asyncio.get_running_loop().time() + error.retry_after)
+
+            except TelegramForbiddenError:
+                return 'blocked'
+
+            except TelegramBadRequest as error:
+                logger.info('Campaign message to chat %s rejected: %s', target.chat_id, error.message)
+                return 'rejected'
+
+            except (TelegramNetworkError, TelegramServerError) as error:
+                logger.info('Campaign message to chat %s failed: %r', target.chat_id, error)
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        return 'failed'
+
+    async def run(self) -> dict:
+        started = time.perf_counter()
+        done = {chat_id for chat_id, outcome in self.progress().items() if outcome not in RETRIED}
+        targets = [target for target in load(self.path) if self.owned is None or self.owned(target.chat_id)]
+        pending = [target for target in targets if target.chat_id not in done]
+
+        async def dispatch(target, file):
+            outcome = await self.send(target)
+            self.counters[outcome] += 1
+
+            if self.metrics is not None:
+                self.metrics.inc('campaign_messages_total', outcome=outcome)
+
+            file.write(json.dumps({'chat_id': target.chat_id, 'outcome': outcome, 'at': time.time()}) + '\n')
+            file.flush()
+
+        with open(self.progress_path, 'a', encoding='utf-8') as file:
+            for start in range(0, len(pending), self.batch):
+                chunk = pending[start:start + self.batch]
+                await self.seed(chunk)
+                await asyncio.gather(*(dispatch(target, file) for target in chunk))
+                logger.info('Campaign %s: %d of %d dispatched', self.path, start + len(chunk), len(pending))
+
+        seconds = time.perf_counter() - started
+        sent = self.counters['sent']
+
+        return {
+            'path': self.path,
+            'targets': len(targets),
+            'skipped': len(targets) - len(pending),
+            'outcomes': {outcome: self.counters[outcome] for outcome in ('sent', 'blocked', 'rejected', 'failed') if self.counters[outcome]},
+            'retry_after': self.counters['retry_after'],
+            'seconds': round(seconds, 3),
+            'messages_per_second': round(sent / seconds, 2) if seconds else 0.0
+        }
@@ -0,0 +1,312 @@
+import asyncio
+import base64
+import contextlib
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata
+)
+
+
+class CheckpointStore(ABC):
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        pass
+
+    @abstractmethod
+    async def scan(self, prefix: str) -> list:
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        pass
+
+    async def purge(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def snapshot(self) -> Optional[dict]:
+        return None
+
+    def restore(self, snapshot: dict):
+        pass
+
+
+class MemoryStore(CheckpointStore):
+
+    def __init__(self):
+        self.data = {}
+
+    def _alive(self, key):
+        value, expires = self.data.get(key, (None, None))
+
+        if expires is not None and expires <= time.time():
+            del self.data[key]
+            return None
+
+        return value
+
+    async def get(self, key):
+        return self._alive(key)
+
+    async def set(self, key, value, ttl=None):
+        self.data[key] = (value, time.time() + ttl if ttl else None)
+
+    async def scan(self, prefix):
+        return sorted(key for key in list(self.data) if key.startswith(prefix) and self._alive(key) is not None)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def purge(self):
+        for key in list(self.data):
+            self._alive(key)
+
+    def snapshot(self):
+        return {
+            key: [base64.b64encode(value).decode(), expires]
+            for key, (value, expires) in self.data.items()
+            if expires is None or expires > time.time()
+        }
+
+    def restore(self, snapshot):
+        self.data.update((key, (base64.b64decode(value), expires)) for key, (value, expires) in snapshot.items())
+
+
+class SQLiteStore(CheckpointStore):
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+        )
+
+    def _execute(self, query, parameters=()):
+        with self.lock:
+            return self.connection.execute(query, parameters).fetchall()
+
+    async def _run(self, query, parameters=()):
+        return await asyncio.to_thread(self._execute, query, parameters)
+
+    async def get(self, key):
+        rows = await self._run(
+            'SELECT value FROM checkpoints WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        )
+        return rows[0][0] if rows else None
+
+    async def set(self, key, value, ttl=None):
+        await self._run(
+            'INSERT OR REPLACE INTO checkpoints (key, value, expires) VALUES (?, ?, ?)',
+            (key, value, time.time() + ttl if ttl else None)
+        )
+
+    async def scan(self, prefix):
+        rows = await self._run(
+            'SELECT key FROM checkpoints WHERE key >= ? AND key < ? AND (expires IS NULL OR expires > ?) ORDER BY key',
+            (prefix, prefix + '\uffff', time.time())
+        )
+        return [key for key, in rows]
+
+    async def delete(self, *keys):
+        for key in keys:
+            await self._run('DELETE FROM checkpoints WHERE key = ?', (key,))
+
+    async def purge(self):
+        await self._run('DELETE FROM checkpoints WHERE expires <= ?', (time.time(),))
+
+    async def close(self):
+        await asyncio.to_thread(self.connection.close)
+
+
+class StoreCheckpointSaver(BaseCheckpointSaver):
+
+    purge_every = 1000
+
+    def __init__(self, store: CheckpointStore, ttl: Optional[float] = None, keep: int = 4, metrics=None):
+        super().__init__()
+        self.store = store
+        self.ttl = ttl
+        self.keep = keep
+        self.metrics = metrics
+        self.puts = 0
+
+    def _timed(self, operation):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+
+        return self.metrics.time('checkpoint_duration_seconds', operation=operation)
+
+    @staticmethod
+    def _key(kind, thread_id, checkpoint_ns='', checkpoint_id=''):
+        return f'{thread_id}\x00{checkpoint_ns}\x00{kind}\x00{checkpoint_id}'
+
+    def _dumps(self, value) -> bytes:
+        kind, data = self.serde.dumps_typed(value)
+        return kind.encode() + b'\x00' + zlib.compress(data)
+
+    def _loads(self, blob: bytes):
+        kind, _, data = blob.partition(b'\x00')
+        return self.serde.loads_typed((kind.decode(), zlib.decompress(data)))
+
+    async def _tuple(self, thread_id, checkpoint_ns, checkpoint_id):
+        record = await self.store.get(self._key('c', thread_id, checkpoint_ns, checkpoint_id))
+
+        if record is None:
+            return None
+
+        checkpoint, metadata, parent_id = self._loads(record)
+        writes = []
+
+        # one key per task, see _put_writes; checkpoint ids have a fixed length, so the prefix holds only this checkpoint's
+        for key in await self.store.scan(self._key('w', thread_id, checkpoint_ns, checkpoint_id)):
+            if (blob := await self.store.get(key)) is not None:
+                writes.extend(self._loads(blob))
+
+        def config(checkpoint_id):
+            return {
+                'configurable': {
+                    'thread_id': thread_id,
+                    'checkpoint_ns': checkpoint_ns,
+                    'checkpoint_id': checkpoint_id
+                }
+            }
+
+        return CheckpointTuple(
+            config=config(checkpoint_id),
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config=config(parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, value) for task_id, _, channel, value in writes]
+        )
+
+    async def aget_tuple(self, config):
+        with self._timed('read'):
+            return await self._get_tuple(config)
+
+    async def _get_tuple(self, config):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_id = get_checkpoint_id(config)
+
+        if not checkpoint_id:
+            keys = await self.store.scan(self._key('c', thread_id, checkpoint_ns))
+
+            if not keys:
+                return None
+
+            checkpoint_id = keys[-1].rpartition('\x00')[2]
+
+        return await self._tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        prefix = f"{config['configurable']['thread_id']}\x00" if config else ''
+        checkpoint_ns = config['configurable'].get('checkpoint_ns') if config else None
+        before_id = get_checkpoint_id(before) if before else None
+
+        for key in reversed(await self.store.scan(prefix)):
+            thread_id, namespace, kind, checkpoint_id = key.split('\x00', 3)
+
+            if kind != 'c' or (checkpoint_ns is not None and namespace != checkpoint_ns):
+                continue
+
+            if config and get_checkpoint_id(config) and checkpoint_id != get_checkpoint_id(config):
+                continue
+
+            if before_id and checkpoint_id >= before_id:
+                continue
+
+            checkpoint = await self._tuple(thread_id, namespace, checkpoint_id)
+
+            if checkpoint is None or (filter and any(checkpoint.metadata.get(k) != v for k, v in filter.items())):
+                continue
+
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+
+            yield checkpoint
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with self._timed('write'):
+            return await self._put(config, checkpoint, metadata)
+
+    async def _put(self, config, checkpoint, metadata):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', '')
+        record = (checkpoint, get_checkpoint_metadata(config, metadata), config['configurable'].get('checkpoint_id'))
+
+        await self.store.set(self._key('c', thread_id, checkpoint_ns, checkpoint['id']), self._dumps(record), self.ttl)
+
+        self.puts += 1
+
+        if self.puts % self.purge_every == 0:
+            await self.store.purge()
+
+        if self.keep:
+            stale = (await self.store.scan(self._key('c', thread_id, checkpoint_ns)))[:-self.keep]
+
+            if stale:
+                stale_ids = {key.rpartition('\x00')[2] for key in stale}
+                writes = [
+                    key for key in await self.store.scan(self._key('w', thread_id, checkpoint_ns))
+                    if key.split('\x00', 3)[3].partition('\x00')[0] in stale_ids
+                ]
+                await self.store.delete(*stale, *writes)
+
+        return {
+            'configurable': {
+                'thread_id': thread_id,
+                'checkpoint_ns': checkpoint_ns,
+                'checkpoint_id': checkpoint['id']
+            }
+        }
+
+    async def aput_writes(self, config, writes, task_id, task_path=''):
+        with self._timed('write_pending'):
+            await self._put_writes(config, writes, task_id)
+
+    async def _put_writes(self, config, writes, task_id):
+        # each task gets its own key: langgraph stores writes from concurrent background tasks,
+        # and a shared key read and written back by two of them at once would lose one task's writes
+        key = self._key(
+            'w',
+            config['configurable']['thread_id'],
+            config['configurable'].get('checkpoint_ns', ''),
+            f"{config['configurable']['checkpoint_id']}\x00{task_id}"
+        )
+        blob = await self.store.get(key)
+        stored = {(write[0], write[1]): write for write in (self._loads(blob) if blob else [])}
+
+        for index, (channel, value) in enumerate(writes):
+            inner = (task_id, WRITES_IDX_MAP.get(channel, index))
+
+            if inner[1] >= 0 and inner in stored:
+                continue
+
+            stored[inner] = (*inner, channel, value)
+
+        await self.store.set(key, self._dumps(list(stored.values())), self.ttl)
+
+    async def adelete_thread(self, thread_id):
+        await self.store.delete(*await self.store.scan(f'{thread_id}\x00'))
@@ -0,0 +1,132 @@
+import collections
+import json
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+
+pattern_token = re.compile(r"[^\W_]+")
+pattern_label = re.compile(r"^- ([A-Z_]+):", re.MULTILINE)
+pattern_negation = re.compile(r"\b(?:not|no|don'?t|doesn'?t|can'?t|won'?t|never|не|нет)\b", re.IGNORECASE)
+pattern_contrast = re.compile(r"\b(?:but|however|though|although|unless|only if|но|однако|хотя|если)\b", re.IGNORECASE)
+pattern_doubt = re.compile(r"\d|\?")
+
+
+def doubted(label: Optional[str], confidence: float, text: str, cap: float = 0.5) -> float:
+    # a counter-offer, a condition or a question is not an agreement, whatever else the message says
+    if label == 'AGREEMENT' and any(pattern.search(text or '') for pattern in (pattern_negation, pattern_contrast, pattern_doubt)):
+        return min(confidence / 2, cap)
+
+    return confidence
+
+
+def labels_of(prompt) -> tuple:
+    return tuple(pattern_label.findall(prompt.template))
+
+
+def tokenize(text: str) -> list:
+    words = pattern_token.findall((text or '').lower())
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+
+class Classifier(ABC):
+
+    @abstractmethod
+    def predict(self, text: str, labels: Iterable[str]) -> tuple[Optional[str], float]:
+        pass
+
+
+class KeywordClassifier(Classifier):
+    keywords = {
+        'AGREEMENT': (
+            'ok', 'okay', 'agree', 'agreed', 'deal', 'accept', 'accepted', 'sounds good', 'works for',
+            'fine', 'yes', 'sure', 'perfect', 'great', 'ок', 'да', 'согласен', 'согласна',
+            'договорились', 'подходит', 'хорошо'
+        ),
+        'LOW_CAP': ('cap', 'maximum', 'max', 'payout', 'limit', 'потолок', 'максимум'),
+        'LOW_CPM': ('cpm', 'rate', 'per mille', 'per thousand', 'low', 'too low', 'more', 'низкий', 'мало'),
+        'NO_CPM': (
+            'fixed', 'flat', 'fix price', 'fixed price', 'flat fee', 'only fixed', 'фикс', 'фиксированная'
+        ),
+        'LOW_FIX_PRICE': (
+            'low', 'too low', 'more', 'higher', 'not enough', 'increase', 'raise', 'мало', 'больше', 'дороже'
+        ),
+    }
+    # 'ok' or 'yes' alone acknowledges a message; only these words accept an offer
+    strong = {
+        'AGREEMENT': (
+            'agree', 'agreed', 'deal', 'accept', 'accepted', 'sounds good', 'works for', 'согласен', 'согласна', 'договорились'
+        ),
+    }
+    single_cap = 0.75
+
+    def predict(self, text, labels):
+        tokens = collections.Counter(tokenize(text))
+        scores = {label: sum(tokens[keyword] for keyword in self.keywords.get(label, ())) for label in labels}
+        total = sum(scores.values())
+
+        if not total:
+            return None, 0.0
+
+        label = max(scores, key=scores.get)
+        confidence = scores[label] / total
+
+        if scores[label] == 1 or (label in self.strong and not any(tokens[keyword] for keyword in self.strong[label])):
+            confidence = min(confidence, self.single_cap)
+
+        return label, confidence
+
+
+class NaiveBayesClassifier(Classifier):
+
+    def __init__(self, priors: dict = None, counts: dict = None, alpha: float = 1.0):
+        self.priors = collections.Counter(priors or {})
+        self.counts = {label: collections.Counter(tokens) for label, tokens in (counts or {}).items()}
+        self.alpha = alpha
+        self.vocabulary = set().union(*self.counts.values()) if self.counts else set()
+
+    def fit(self, samples: Iterable[tuple[str, str]]):
+        for text, label in samples:
+            self.priors[label] += 1
+            self.counts.setdefault(label, collections.Counter()).update(set(tokenize(text)))
+
+        self.vocabulary = set().union(*self.counts.values()) if self.counts else set()
+        return self
+
+    def predict(self, text, labels):
+        labels = list(labels)
+
+        if not labels or not self.priors:
+            return None, 0.0
+
+        tokens = set(tokenize(text)) & self.vocabulary
+
+        # with no known word the posterior is just the prior, which says nothing about this message
+        if not tokens:
+            return None, 0.0
+
+        scores = {}
+
+        for label in labels:
+            counts, total = self.counts.get(label, collections.Counter()), self.priors[label]
+            scores[label] = math.log(total + self.alpha) + sum(
+                math.log((counts[token] + self.alpha) / (total + 2 * self.alpha)) for token in tokens
+            )
+
+        best = max(scores.values())
+        weights = {label: math.exp(score - best) for label, score in scores.items()}
+        label = max(weights, key=weights.get)
+
+        return label, weights[label] / sum(weights.values())
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'alpha': self.alpha, 'priors': self.priors, 'counts': self.counts}, file, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding='utf-8') as file:
+            model = json.load(file)
+
+        return cls(model['priors'], model['counts'], model['alpha'])
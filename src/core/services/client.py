@@ -0,0 +1,126 @@
+import asyncio
+import collections
+import functools
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+from .limiters import CircuitBreaker, TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(RuntimeError):
+    pass
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class LLMClient:
+
+    def __init__(
+        self,
+        model=None,
+        timeout: float = 60.0,
+        concurrency: int = 16,
+        rate: float = 0.0,
+        burst: int = 1,
+        retries: int = 3,
+        backoff: float = 0.5,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        metrics=None,
+        prompts=None,
+        factory: Optional[Callable] = None,
+        bucket: Optional[TokenBucket] = None
+    ):
+        if model is not None:
+            self.model = model
+
+        self.factory = factory
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # clients on the same account pass one bucket, the provider limits the key and not the route
+        self.bucket = bucket if bucket is not None else TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.counters = collections.Counter()
+        self.metrics = metrics
+        self.prompts = prompts
+
+    @functools.cached_property
+    def model(self):
+        return self.factory()
+
+    @functools.cached_property
+    def retryable(self) -> tuple:
+        # openai takes over a second to import; it is loaded with the model, not at bot start
+        import openai
+
+        return (
+            asyncio.TimeoutError,
+            ConnectionError,
+            openai.APIConnectionError,
+            openai.APITimeoutError,
+            openai.RateLimitError,
+            openai.InternalServerError
+        )
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.model, 'model_name', type(self.model).__name__)
+
+    def _record(self, input, started, outcome, response=None):
+        if self.metrics is None:
+            return
+
+        prompt = self.prompts.name(input) if self.prompts else 'unknown'
+        self.metrics.observe('llm_duration_seconds', time.perf_counter() - started, prompt=prompt, outcome=outcome)
+        usage = getattr(response, 'usage_metadata', None) or {}
+
+        for kind in ('input_tokens', 'output_tokens'):
+            if usage.get(kind):
+                self.metrics.inc('llm_tokens_total', usage[kind], prompt=prompt, kind=kind.removesuffix('_tokens'))
+
+    def _degrade(self, error):
+        self.counters['degraded'] += 1
+
+        if isinstance(error, LLMUnavailableError):
+            raise error
+
+        raise LLMUnavailableError(f'{self.model_name} is unavailable: {error!r}') from error
+
+    async def ainvoke(self, input, config=None):
+        if not self.breaker.allow():
+            self._degrade(CircuitOpenError(f'{self.model_name} circuit is open'))
+
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+
+            try:
+                async with self.semaphore:
+                    await self.bucket.acquire()
+                    response = await asyncio.wait_for(self.model.ainvoke(input, config), self.timeout)
+
+                self.breaker.success()
+                self.counters['calls'] += 1
+                self._record(input, started, 'ok', response)
+
+                return response
+
+            except self.retryable as error:
+                self.breaker.failure()
+                self.counters['failures'] += 1
+                self._record(input, started, type(error).__name__)
+                logger.warning('%s call failed (attempt %d): %r', self.model_name, attempt + 1, error)
+
+                if attempt == self.retries or not self.breaker.allow():
+                    self._degrade(error)
+
+                self.counters['retries'] += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
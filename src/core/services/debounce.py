@@ -0,0 +1,38 @@
+import asyncio
+import time
+import weakref
+from typing import Optional
+
+
+class Debouncer:
+
+    def __init__(self, window: float):
+        self.window = window
+        self.bursts = {}
+        self.locks = weakref.WeakValueDictionary()
+
+    def lock(self, chat_id) -> asyncio.Lock:
+        lock = self.locks.get(chat_id)
+
+        if lock is None:
+            self.locks[chat_id] = lock = asyncio.Lock()
+
+        return lock
+
+    async def collect(self, chat_id, text: str) -> Optional[str]:
+        if chat_id in self.bursts:
+            texts, _ = self.bursts[chat_id]
+            texts.append(text)
+            self.bursts[chat_id] = (texts, time.monotonic())
+            return None
+
+        self.bursts[chat_id] = ([text], time.monotonic())
+
+        try:
+            while (delay := self.bursts[chat_id][1] + self.window - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+
+        finally:
+            texts, _ = self.bursts.pop(chat_id)
+
+        return '\n'.join(texts)
@@ -1,27 +1,112 @@
 import asyncio
+import collections
+import contextlib
+import functools
+import json
+import os
 
 from langgraph.graph import StateGraph
-from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage
 from langgraph.types import interrupt, Command
 
 from .nodes import *
+from .extractors import Extractor
+from .classifiers import KeywordClassifier, NaiveBayesClassifier, doubted, labels_of
+from .streaming import ChatThrottle
+from .checkpointers import MemoryStore, SQLiteStore, StoreCheckpointSaver
+from .sessions import SessionRegistry
+from .debounce import Debouncer
+from .jobs import JobJournal, JobQueue
+from .cache import ResponseCache
+from .client import LLMClient, LLMUnavailableError
+from .limiters import TokenBucket
+from .routing import Router
+from .speculation import Speculator
+from .metrics import MetricsRegistry, NodeMetricsHandler
+from .prompts import PromptRegistry
+from .pricing import PricingPolicy
+from .tracing import Tracer, TracingHandler
 
 
 class Engine:
 
-	def __init__(self, api_key: str):
+	def __init__(self, settings):
 
-		self.llm = ChatOpenAI(model="gpt-4", api_key=api_key)
-		self.interruptions = {}
-		self.success = True
-		self.cpm = False
+		self.settings = settings
+		self.metrics = MetricsRegistry()
+		self.pricing = PricingPolicy(**settings.PRICING_POLICY)
+		self.prompts = PromptRegistry(settings.PROMPT_MESSAGE_BUDGET, settings.PROMPT_TOKENIZER, self.metrics)
+		self.bucket = TokenBucket(settings.LLM_RATE, settings.LLM_BURST)
+		self.llms = self.setup_models()
+		self.extractor = Extractor()
+		self.classifications = collections.Counter()
+		self.throttle = ChatThrottle(settings.STREAMING_EDIT_INTERVAL)
+		self.debouncer = Debouncer(settings.DEBOUNCE_WINDOW)
+		self.cache = ResponseCache(settings.CACHE_SIZE, settings.CACHE_TTL, settings.CACHE_PATH, settings.CACHE_DISK_SIZE)
+		self.sessions = SessionRegistry(settings.SESSIONS_MAX, settings.SESSIONS_TTL)
+		self.speculator = Speculator(self.sessions, settings.SPECULATION_TTL, self.metrics)
+		self.jobs = self.setup_jobs()
+		self.warming = None
 
 		self.setup_prompts()
+		self.setup_classifier()
 		self.setup_workflow()
 		self.setup_auxiliary()
+		self.setup_metrics()
+		self.setup_tracing()
+
+	def setup_model(self, model):
+
+		from langchain_openai import ChatOpenAI
+
+		return ChatOpenAI(
+			model = model,
+			api_key = self.settings.OPENAI_API_TOKEN.get_secret_value(),
+			base_url = self.settings.OPENAI_BASE_URL,
+			max_retries = 0
+		)
+
+	def setup_client(self, model, task = None):
+
+		return LLMClient(
+			factory = functools.partial(self.setup_model, model),
+			timeout = self.settings.LLM_ROUTE_TIMEOUT.get(task, self.settings.LLM_TIMEOUT),
+			concurrency = self.settings.LLM_ROUTE_CONCURRENCY.get(task, self.settings.LLM_CONCURRENCY),
+			bucket = self.bucket,
+			retries = self.settings.LLM_RETRIES,
+			backoff = self.settings.LLM_BACKOFF,
+			breaker_threshold = self.settings.LLM_BREAKER_THRESHOLD,
+			breaker_cooldown = self.settings.LLM_BREAKER_COOLDOWN,
+			metrics = self.metrics,
+			prompts = self.prompts
+		)
+
+	def setup_models(self):
+
+		return Router(
+			{task: self.setup_client(self.settings.LLM_ROUTES.get(task, self.settings.LLM_MODEL), task) for task in Router.tasks},
+			reference = self.setup_client(self.settings.LLM_EVAL_MODEL) if self.settings.LLM_EVAL_MODEL else None,
+			rate = self.settings.LLM_EVAL_RATE,
+			path = self.settings.LLM_EVAL_LOG_PATH,
+			metrics = self.metrics
+		)
+
+	def setup_jobs(self):
+
+		path = self.settings.JOBS_JOURNAL_PATH
+
+		if path and self.settings.SHARD is not None:
+
+			path += f'.{self.settings.SHARD}'
+
+		return JobQueue(
+			self.settings.JOBS_CONCURRENCY,
+			metrics = self.metrics,
+			journal = JobJournal(path) if path else None,
+			typing_delay = self.settings.JOBS_TYPING_DELAY,
+			typing_interval = self.settings.JOBS_TYPING_INTERVAL
+		)
 
 	def setup_workflow(self):
 
@@ -38,9 +123,35 @@ class Engine:
 		self.workflow.add_node("END", EndNode(self))
 		self.workflow.set_finish_point("END")
 
-		self.memory = MemorySaver()
+		self.memory = self.setup_checkpointer()
 		self.app = self.workflow.compile(checkpointer = self.memory)
 
+	def setup_checkpointer(self):
+
+		match self.settings.CHECKPOINT_BACKEND:
+
+			case 'sqlite':
+
+				store = SQLiteStore(self.settings.CHECKPOINT_PATH)
+
+			case _:
+
+				store = MemoryStore()
+
+		return StoreCheckpointSaver(store, ttl = self.settings.CHECKPOINT_TTL, keep = self.settings.CHECKPOINT_KEEP, metrics = self.metrics)
+
+	def setup_classifier(self):
+
+		path = self.settings.CLASSIFIER_MODEL_PATH
+
+		if path and os.path.exists(path):
+
+			self.classifier = NaiveBayesClassifier.load(path)
+
+		else:
+
+			self.classifier = KeywordClassifier()
+
 	def setup_prompts(self):
 
 		self.prompt_find_views = PromptTemplate(
@@ -66,64 +177,370 @@ class Engine:
 			)
 		)
 
+		self.prompt_detect_and_compose = PromptTemplate(
+			input_variables=["detection", "offers"],
+			template=(
+				"Complete two steps in a single answer. "
+				"Step 1: follow the classification task below and choose exactly one of its options. "
+				"Step 2: if the chosen option is listed under the offers, write the message described for it; otherwise the message is null. "
+				"The offers refer to the same influencer message as the classification task.\n"
+				"Respond strictly with a JSON object of the form {{\"label\": \"<option>\", \"message\": \"<text or null>\"}}.\n\n"
+				"Offers:\n"
+				"{offers}\n\n"
+				"Classification task: {detection}\n\n"
+				"Response:"
+			)
+		)
+
+	def setup_metrics(self):
+
+		self.prompts.register(self)
+		self.node_metrics = NodeMetricsHandler(self.metrics)
+
+		@self.metrics.collector
+		def collect():
+
+			for task, client in self.llms.items():
+
+				yield from (('llm_calls_total', {'task': task, 'outcome': kind}, value) for kind, value in client.counters.items())
+				yield 'llm_circuit_open', {'task': task}, int(client.breaker.state == 'open')
+
+			yield from (('classifications_total', {'via': via}, value) for via, value in self.classifications.items())
+			yield from (('cache_lookups_total', {'result': kind}, value) for kind, value in self.cache.counters.items() if kind != 'writes')
+			yield from (('extractor_total', {'kind': kind, 'result': 'hit'}, value) for kind, value in self.extractor.hits.items())
+			yield from (('extractor_total', {'kind': kind, 'result': 'fallback'}, value) for kind, value in self.extractor.fallbacks.items())
+			yield 'sessions', {}, len(self.sessions)
+			yield from (('job_queue_depth', {'priority': priority}, depth) for priority, depth in self.jobs.depths().items())
+			yield 'jobs_running', {}, self.jobs.running
+
+	def setup_tracing(self):
+
+		self.tracer, self.callbacks = None, [self.node_metrics]
+
+		if self.settings.TRACE_PATH:
+
+			self.tracer = Tracer(self.settings.TRACE_PATH, self.settings.TRACE_SAMPLE_RATE)
+			self.callbacks.append(TracingHandler(
+				self.tracer,
+				self.prompts,
+				lambda state: str(self.pricing.ladder(state.get('client_cpm'), state.get('min_views'), state.get('max_views')).cap)
+			))
+
 	def setup_auxiliary(self):
 
 		async def find_data_views(text):
 
+			views = self.extractor.range(text, 'views')
+
+			if views is not None:
+
+				return [str(value) for value in views]
+
 			message = HumanMessage(
-				content = self.prompt_find_views.format(
+				content = self.prompts.format(
+					self.prompt_find_views,
 					text = text
 				)
 			)
-			response = (await self.llm.ainvoke(message.content)).content.strip()
+			response = await self.ainvoke_cached(message.content, 'extract')
 			response = response.split()
 
 			return response
 
 		async def find_data_cpm(text):
 
+			cpm = self.extractor.number(text, 'cpm')
+
+			if cpm is not None:
+
+				return str(cpm)
+
 			message = HumanMessage(
-				content = self.prompt_find_cpm.format(
+				content = self.prompts.format(
+					self.prompt_find_cpm,
 					text = text
 				)
 			)
-			response = (await self.llm.ainvoke(message.content)).content.strip()
+			response = await self.ainvoke_cached(message.content, 'extract')
 			
 			return response
 
 		self.find_data_views = find_data_views
 		self.find_data_cpm = find_data_cpm
 
+	def warm(self):
+
+		self.prompts.load()
+
+		for _, client in self.llms.items():
+
+			client.model
+
+		if self.llms.reference is not None:
+
+			self.llms.reference.model
+
+	def warmup(self):
+
+		self.warming = asyncio.ensure_future(asyncio.to_thread(self.warm))
+
+		return self.warming
+
+	async def close(self):
+
+		for user_id in list(self.sessions.sessions):
+
+			self.speculator.discard(user_id)
+
+		for evaluation in list(self.llms.pending):
+
+			evaluation.cancel()
+
+		await self.memory.store.close()
+		await self.jobs.close()
+
+		if self.tracer:
+
+			self.tracer.close()
+
+	async def ready(self):
+
+		if self.warming is not None and not self.warming.done():
+
+			await asyncio.wait({self.warming})
+
+	async def ainvoke_cached(self, content, task):
+
+		await self.ready()
+
+		key = self.cache.key(self.llms[task].model_name, content)
+
+		if (response := await self.cache.get(key)) is not None:
+
+			return response
+
+		response = (await self.llms[task].ainvoke(content)).content.strip()
+		await self.cache.set(key, response)
+		self.llms.shadow(task, content, response)
+
+		return response
+
+	def classify_locally(self, prompt, text):
+
+		label, confidence = self.classifier.predict(text, labels_of(prompt))
+		confidence = doubted(label, confidence, text)
+
+		if label is not None and confidence >= self.settings.CLASSIFIER_THRESHOLD:
+
+			self.classifications['local'] += 1
+			return label
+
+	def log_behaviour(self, prompt, text, label):
+
+		if self.settings.CLASSIFIER_LOG_PATH and label in labels_of(prompt):
+
+			with open(self.settings.CLASSIFIER_LOG_PATH, 'a', encoding = 'utf-8') as file:
+
+				file.write(json.dumps({'text': text, 'labels': labels_of(prompt), 'label': label}, ensure_ascii = False) + '\n')
+
+	async def detect_behaviour(self, prompt, text):
+
+		if (label := self.classify_locally(prompt, text)) is not None:
+
+			return label
+
+		message = HumanMessage(
+			content = self.prompts.format(
+				prompt,
+				text = text
+			)
+		)
+		label = await self.ainvoke_cached(message.content, 'classify')
+		self.classifications['llm'] += 1
+		self.log_behaviour(prompt, text, label)
+
+		return label
+
+	async def detect_and_compose(self, prompt, text, offers):
+
+		if (label := self.classify_locally(prompt, text)) is not None:
+
+			return label, None
+
+		message = HumanMessage(
+			content = self.prompt_detect_and_compose.format(
+				detection = prompt.format(text = self.prompts.truncate(text)).removesuffix('Response:').strip(),
+				offers = '\n'.join(
+					f"- {label}: {offer.format(**{**kwargs(), 'text': '(quoted in the classification task)'}).removesuffix('Response:').strip()}"
+					for label, (offer, kwargs) in offers.items()
+				) or '- none'
+			)
+		)
+		response = (await self.llms['compose'].ainvoke(message.content)).content.strip()
+
+		try:
+
+			decision = json.loads(response[response.index('{'):response.rindex('}') + 1])
+			label, composed = decision['label'].strip(), decision.get('message')
+
+		except (ValueError, KeyError, AttributeError):
+
+			return await self.detect_behaviour(prompt, text), None
+
+		self.classifications['combined'] += 1
+		self.log_behaviour(prompt, text, label)
+
+		if label not in offers or not isinstance(composed, str) or not composed.strip():
+
+			return label, None
+
+		return label, composed.strip()
+
 	async def reset(self, user_id):
 
 		try:
 
-			self.interruptions[user_id] = False
-			self.memory.delete(user_id)	
+			self.speculator.discard(user_id)
+			session = self.sessions.create(user_id)
+
+			if self.tracer:
+
+				self.tracer.adopt(session.trace_id)
+
+			await self.memory.adelete_thread(user_id)
 
 		except:
 
 			pass
 
-	async def query(self, state: State, user_id):
+	async def session(self, user_id, config):
+
+		session = self.sessions.get(user_id)
+
+		if session is None:
+
+			# aget_state rewrites configurable in place (thread_id becomes a string), so it gets its own copy
+			snapshot = await self.app.aget_state({**config, 'configurable': dict(config['configurable'])})
+			session = self.sessions.create(user_id, interrupted = bool(snapshot.values))
+
+		if self.tracer:
+
+			self.tracer.adopt(session.trace_id)
+
+		return session
+
+	def ladder(self, user_id, state):
+
+		inputs = (state.get('client_cpm'), state.get('min_views'), state.get('max_views'))
+		session = self.sessions.get(user_id)
+
+		if session is not None and session.ladder is not None and session.ladder.inputs == inputs:
+
+			return session.ladder
+
+		ladder = self.pricing.ladder(*inputs)
+
+		if session is not None:
+
+			session.ladder = ladder
+
+		return ladder
+
+	async def prepare(self, state: State, user_id):
+
+		await self.ready()
 
 		initial_state = {
 			'message': state.get('message'),
 			'client_cpm': state.get('client_cpm'),
 			'influencer_price': state.get('influencer_price'),
 			'max_views': state.get('max_views'),
-			'min_views': state.get('min_views')
+			'min_views': state.get('min_views'),
+			'success': True,
+			'cpm': False
 		}
 
 		config = {
 			"configurable": {
 				"thread_id": user_id
-			}
+			},
+			"callbacks": self.callbacks
 		}
 
-		if not self.interruptions[user_id]:
+		session = await self.session(user_id, config)
+
+		if not session.interrupted:
+
+			session.interrupted = True
+			return initial_state, config
+
+		return Command(resume = initial_state), config
+
+	def trace(self, state: State, user_id):
+
+		if self.tracer is None:
+
+			return contextlib.nullcontext()
+
+		return self.tracer.span(
+			'query',
+			thread_id = user_id,
+			**{key: state.get(key) for key in TracingHandler.prices}
+		)
+
+	async def unavailable(self, state: State, user_id, config):
+
+		# the failed node never finished, so the graph stays where it was and re-runs it on the next message
+		snapshot = await self.app.aget_state({**config, 'configurable': dict(config['configurable'])})
+		session = self.sessions.get(user_id)
+
+		if session is not None:
+
+			session.interrupted = bool(snapshot.interrupts)
+
+		return {**state, 'message': self.settings.LLM_FALLBACK_MESSAGE}
+
+	async def query(self, state: State, user_id):
+
+		with self.trace(state, user_id):
+
+			input, config = await self.prepare(state, user_id)
+
+			try:
+
+				return await self.app.ainvoke(input, config = config)
+
+			except LLMUnavailableError:
+
+				return await self.unavailable(state, user_id, config)
+
+	async def query_stream(self, state: State, user_id):
+
+		with self.trace(state, user_id):
+
+			input, config = await self.prepare(state, user_id)
+			message_id, values = None, {}
+
+			try:
+
+				async for mode, chunk in self.app.astream(input, config = config, stream_mode = ['messages', 'values']):
+
+					if mode == 'values':
+
+						values.update(chunk)
+
+					elif 'compose' in chunk[1].get('tags', ()) and chunk[0].content:
+
+						if chunk[0].id != message_id:
+
+							message_id = chunk[0].id
+							yield 'reset', None
+
+						yield 'token', chunk[0].content
+
+			except LLMUnavailableError:
 
-			self.interruptions[user_id] = True
-			return await self.app.ainvoke(initial_state, config = config)
+				values = await self.unavailable(state, user_id, config)
+				yield 'reset', None
 
-		return await self.app.ainvoke(Command(resume = initial_state), config = config)
+		yield 'values', values
@@ -0,0 +1,132 @@
+import collections
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+
+class Extractor:
+    multipliers = {'k': 1_000, 'к': 1_000, 't': 1_000, 'т': 1_000, 'm': 1_000_000, 'м': 1_000_000}
+
+    pattern_number = re.compile(
+        r"(?P<currency>[$€£₽]\s*)?"
+        r"(?P<integer>\d{1,3}(?:[,'\u00a0\u202f]\d{3})+(?!\d)|\d+)"
+        r"(?:[.,](?P<fraction>\d+))?"
+        r"(?:\s*(?P<suffix>thousands?|millions?|тыс[а-яё]*|млн|mln|k|к|m|м)\.?(?![a-zа-яё]))?",
+        re.IGNORECASE
+    )
+    pattern_range = re.compile(r"^\s*(?:-|–|—|\.\.|to|до|\s)\s*$", re.IGNORECASE)
+    pattern_currency = re.compile(r"[$€£₽]|\b(?:usd|eur|rub|dollars?|руб\w*)\b", re.IGNORECASE)
+    pattern_word = re.compile(r"[^\W\d_]+")
+    pattern_clock = re.compile(
+        r"(?<!\d)(?:\d{1,2}:\d{2}|\d{1,2}[./]\d{1,2}[./]\d{2,4}|\d{4}-\d{1,2}-\d{1,2})(?!\d)"
+    )
+    pattern_calendar = re.compile(
+        r"^(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?"
+        r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+        r"|mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?"
+        r"|st|nd|rd|th|am|pm|o|days?|weeks?|months?|years?|hours?|hrs?|minutes?|mins?|sec(?:ond)?s?"
+        r"|январ[а-яё]*|феврал[а-яё]*|март[а-яё]*|апрел[а-яё]*|ма[йяе]|июн[а-яё]*|июл[а-яё]*|август[а-яё]*"
+        r"|сентябр[а-яё]*|октябр[а-яё]*|ноябр[а-яё]*|декабр[а-яё]*"
+        r"|понедельник[а-яё]*|вторник[а-яё]*|сред[аеуы]|четверг[а-яё]*|пятниц[а-яё]*|суббот[а-яё]*|воскресень[а-яё]*"
+        r"|го|е|ое|ого|числ[а-яё]*|д(?:ень|ня|ней|ни)|недел[а-яё]*|месяц[а-яё]*|год[а-яё]*|лет|час[а-яё]*|минут[а-яё]*)$",
+        re.IGNORECASE
+    )
+
+    max_words = 4
+
+    def __init__(self):
+        self.hits = collections.Counter()
+        self.fallbacks = collections.Counter()
+
+    def rate(self, kind: str) -> float:
+        total = self.hits[kind] + self.fallbacks[kind]
+        return self.hits[kind] / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            kind: {'hits': self.hits[kind], 'fallbacks': self.fallbacks[kind], 'rate': self.rate(kind)}
+            for kind in sorted(set(self.hits) | set(self.fallbacks))
+        }
+
+    def _multiplier(self, match) -> int:
+        suffix = (match.group('suffix') or '').lower()
+        return self.multipliers[suffix[0]] if suffix else 1
+
+    def _dated(self, text: str, match) -> bool:
+        # "March 20", "20th", "5 pm", "in 2 weeks": the number is a date or a time, not an amount
+        before = re.search(r"([^\W\d_]+)[\s,.]*$", text[:match.start()])
+        after = re.match(r"[\s,.\-']*(?:of\s+)?([^\W\d_]+)", text[match.end():])
+
+        return any(found and self.pattern_calendar.match(found.group(1)) for found in (before, after))
+
+    def _parse(self, match) -> Optional[Decimal]:
+        integer = re.sub(r"[,'\u00a0\u202f]", '', match.group('integer'))
+        fraction = match.group('fraction')
+        if fraction and len(fraction) == 3 and not match.group('suffix'):
+            return None
+
+        try:
+            value = Decimal(f'{integer}.{fraction}' if fraction else integer)
+        except InvalidOperation:
+            return None
+
+        return value * self._multiplier(match)
+
+    def _scan(self, text: str) -> Optional[list]:
+        if not text or '%' in text or self.pattern_clock.search(text):
+            return None
+
+        matches = list(self.pattern_number.finditer(text))
+
+        if any(self._dated(text, match) for match in matches):
+            return None
+
+        numbers = [self._parse(match) for match in matches]
+
+        if any(number is None or number != number.to_integral_value() for number in numbers):
+            return None
+
+        unmatched = self.pattern_number.sub(' ', text)
+        confident = bool(self.pattern_currency.search(text)) or any(match.group('suffix') for match in matches)
+
+        if len(self.pattern_word.findall(self.pattern_currency.sub(' ', unmatched))) > self.max_words and not confident:
+            return None
+
+        return list(zip(matches, numbers))
+
+    def number(self, text: str, kind: str = 'number') -> Optional[int]:
+        scanned = self._scan(text)
+
+        if not scanned or len({number for _, number in scanned}) != 1:
+            self.fallbacks[kind] += 1
+            return None
+
+        self.hits[kind] += 1
+        return int(scanned[0][1])
+
+    def range(self, text: str, kind: str = 'range') -> Optional[tuple]:
+        scanned = self._scan(text)
+
+        if not scanned or len(scanned) > 2:
+            self.fallbacks[kind] += 1
+            return None
+
+        if len(scanned) == 1:
+            self.hits[kind] += 1
+            return int(scanned[0][1]), int(scanned[0][1])
+
+        (first_match, first), (second_match, second) = scanned
+
+        separator = text[first_match.end():second_match.start()]
+        grouped = not separator.strip() and len(second_match.group('integer')) == 3 and not second_match.group('suffix')
+
+        if not self.pattern_range.match(separator) or grouped:
+            self.fallbacks[kind] += 1
+            return None
+
+        multiplier = self._multiplier(second_match)
+        if not first_match.group('suffix') and first * multiplier <= second:
+            first *= multiplier
+
+        self.hits[kind] += 1
+        return int(min(first, second)), int(max(first, second))
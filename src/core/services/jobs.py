@@ -0,0 +1,186 @@
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def update_of(message) -> dict:
+    return {'update_id': 0, 'message': message.model_dump(mode='json', exclude_none=True, by_alias=True)}
+
+
+class JobJournal:
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, priority TEXT NOT NULL, "update" TEXT NOT NULL, enqueued REAL NOT NULL)'
+        )
+
+    def _execute(self, query, parameters=()):
+        with self.lock:
+            cursor = self.connection.execute(query, parameters)
+            return cursor.lastrowid, cursor.fetchall()
+
+    async def _run(self, query, parameters=()):
+        return await asyncio.to_thread(self._execute, query, parameters)
+
+    async def add(self, priority: str, update: dict) -> int:
+        job_id, _ = await self._run(
+            'INSERT INTO jobs (priority, "update", enqueued) VALUES (?, ?, ?)',
+            (priority, json.dumps(update, ensure_ascii=False), time.time())
+        )
+        return job_id
+
+    async def remove(self, job_id: int):
+        await self._run('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    async def pending(self) -> list:
+        _, rows = await self._run('SELECT id, priority, "update" FROM jobs ORDER BY id')
+        return [(job_id, priority, json.loads(update)) for job_id, priority, update in rows]
+
+    async def close(self):
+        await asyncio.to_thread(self.connection.close)
+
+
+class JobQueue:
+    priorities = ('extract', 'query')
+
+    def __init__(
+        self,
+        concurrency: int,
+        metrics=None,
+        journal: Optional[JobJournal] = None,
+        typing_delay: float = 0.5,
+        typing_interval: float = 4.0
+    ):
+        self.concurrency = concurrency
+        self.metrics = metrics
+        self.journal = journal
+        self.typing_delay = typing_delay
+        self.typing_interval = typing_interval
+        self.waiting = {priority: collections.OrderedDict() for priority in self.priorities}
+        self.running = 0
+
+    def depths(self) -> dict:
+        return {priority: sum(map(len, users.values())) for priority, users in self.waiting.items()}
+
+    def _next(self):
+        for users in self.waiting.values():
+            if users:
+                user_id, futures = next(iter(users.items()))
+                future = futures.popleft()
+
+                # the user goes to the back of the line, so one chatty user cannot hold the class
+                if futures:
+                    users.move_to_end(user_id)
+
+                else:
+                    del users[user_id]
+
+                return future
+
+    def _grant(self):
+        while self.running < self.concurrency and (future := self._next()) is not None:
+            self.running += 1
+            future.set_result(None)
+
+    def _release(self):
+        self.running -= 1
+        self._grant()
+
+    def _withdraw(self, priority, user_id, future):
+        users = self.waiting[priority]
+
+        if user_id in users:
+            with contextlib.suppress(ValueError):
+                users[user_id].remove(future)
+
+            if not users[user_id]:
+                del users[user_id]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: str, user_id):
+        if priority not in self.waiting:
+            raise ValueError(f'priority must be one of {self.priorities}')
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[priority].setdefault(user_id, collections.deque()).append(future)
+        self._grant()
+
+        try:
+            await future
+
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+
+            else:
+                self._withdraw(priority, user_id, future)
+
+            raise
+
+        try:
+            yield
+
+        finally:
+            self._release()
+
+    async def _typing(self, message):
+        await asyncio.sleep(self.typing_delay)
+
+        while True:
+            try:
+                await message.bot.send_chat_action(chat_id=message.chat.id, action='typing')
+
+            except Exception as error:
+                logger.debug('Typing indicator for chat %s failed: %r', message.chat.id, error)
+
+            await asyncio.sleep(self.typing_interval)
+
+    async def run(self, priority: str, user_id, function, message=None):
+        typing = asyncio.create_task(self._typing(message)) if message is not None and message.bot is not None else None
+        enqueued = time.perf_counter()
+        job_id, outcome = None, 'error'
+
+        try:
+            if self.journal is not None and message is not None:
+                job_id = await self.journal.add(priority, update_of(message))
+
+            async with self.slot(priority, user_id):
+                if self.metrics is not None:
+                    self.metrics.observe('job_wait_seconds', time.perf_counter() - enqueued, priority=priority)
+
+                result = await function()
+                outcome = 'done'
+
+                return result
+
+        except asyncio.CancelledError:
+            # stays in the journal, the next process replays it
+            job_id, outcome = None, 'cancelled'
+            raise
+
+        finally:
+            if typing is not None:
+                typing.cancel()
+
+            if self.metrics is not None:
+                self.metrics.inc('jobs_total', priority=priority, outcome=outcome)
+
+            if job_id is not None:
+                await self.journal.remove(job_id)
+
+    async def close(self):
+        if self.journal is not None:
+            await self.journal.close()
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        async with self.lock:
+            self._refill()
+
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+
+            self.tokens -= 1
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = None
+
+    @property
+    def state(self) -> str:
+        if self.opened is None:
+            return 'closed'
+
+        return 'half-open' if time.monotonic() - self.opened >= self.cooldown else 'open'
+
+    def allow(self) -> bool:
+        return self.state != 'open'
+
+    def success(self):
+        self.failures = 0
+        self.opened = None
+
+    def failure(self):
+        self.failures += 1
+
+        if self.failures >= self.threshold or self.state == 'half-open':
+            self.opened = time.monotonic()
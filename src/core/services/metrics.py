@@ -0,0 +1,110 @@
+import bisect
+import collections
+import contextlib
+import time
+
+import aiogram
+from langchain_core.callbacks import AsyncCallbackHandler
+from langgraph.errors import GraphInterrupt
+
+
+class MetricsRegistry:
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self.counters = collections.defaultdict(float)
+        self.histograms = {}
+        self.collectors = []
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self.counters[name, self._labels(labels)] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, self._labels(labels))
+        histogram = self.histograms.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+        index = bisect.bisect_left(self.buckets, value)
+
+        if index < len(self.buckets):
+            histogram[0][index] += 1
+
+        histogram[1] += value
+        histogram[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, name: str, **labels):
+        started = time.perf_counter()
+
+        try:
+            yield labels
+
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def collector(self, function):
+        self.collectors.append(function)
+        return function
+
+    @staticmethod
+    def _format(name, labels, value, extra=()):
+        labels = ','.join(f'{key}="{value}"' for key, value in (*labels, *extra))
+        return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+    def render(self) -> str:
+        lines = []
+
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(self._format(name, labels, value))
+
+        for (name, labels), (counts, total, count) in sorted(self.histograms.items()):
+            cumulative = 0
+
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(self._format(f'{name}_bucket', labels, cumulative, (('le', bound),)))
+
+            lines.append(self._format(f'{name}_bucket', labels, count, (('le', '+Inf'),)))
+            lines.append(self._format(f'{name}_sum', labels, total))
+            lines.append(self._format(f'{name}_count', labels, count))
+
+        for function in self.collectors:
+            for name, labels, value in function():
+                lines.append(self._format(name, self._labels(labels), value))
+
+        return '\n'.join(lines) + '\n'
+
+
+class NodeMetricsHandler(AsyncCallbackHandler):
+    run_inline = True
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.started = {}
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        if metadata and kwargs.get('name') == metadata.get('langgraph_node'):
+            self.started[run_id] = (kwargs['name'], time.perf_counter())
+
+    def _finish(self, run_id, branch):
+        if run_id in self.started:
+            node, started = self.started.pop(run_id)
+            self.registry.observe('node_duration_seconds', time.perf_counter() - started, node=node, branch=branch)
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id, str(getattr(outputs, 'goto', None) or 'return'))
+
+    async def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, 'interrupt' if isinstance(error, GraphInterrupt) else 'error')
+
+
+class HandlerMetricsMiddleware(aiogram.BaseMiddleware):
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    async def __call__(self, handler, event, data):
+        with self.registry.time('handler_duration_seconds', handler=data['handler'].callback.__name__):
+            return await handler(event, data)
@@ -1,6 +1,10 @@
+import functools
 from abc import ABC, abstractmethod, abstractproperty
 from typing import TypedDict
 
+from langchain_core.messages import HumanMessage
+from langgraph.config import get_config
+
 
 class State(TypedDict):
     message: str
@@ -8,23 +12,66 @@ class State(TypedDict):
     influencer_price: str
     min_views: str
     max_views: str
+    success: bool
+    cpm: bool
 
 
 class Node(ABC):
     engine = None
 
-    @staticmethod
-    def _calc_cap(state):
-        return str(
-            int(int(state.get('client_cpm')) / 4000 * (int(state.get('min_views')) + 3 * int(state.get('max_views')))))
+    @property
+    def name(self):
+        return get_config()['metadata']['langgraph_node']
+
+    @property
+    def thread(self):
+        return get_config()['configurable']['thread_id']
+
+    def ladder(self, state):
+        return self.engine.ladder(self.thread, state)
+
+    @property
+    def combined(self):
+        return self.name in self.engine.settings.COMBINED_NODES
+
+    @property
+    def speculative(self):
+        return self.name in self.engine.settings.SPECULATIVE_NODES
+
+    async def detect_behaviour(self, prompt, state):
+        return await self.engine.detect_behaviour(prompt, state.get('message'))
+
+    async def compose(self, prompt, task='compose', **kwargs):
+        message = HumanMessage(content=self.engine.prompts.format(prompt, **kwargs))
+        # no fallback here: a canned apology is not the offer the node is about to move the graph to
+        response = await self.engine.llms[task].ainvoke(message.content, config={'tags': ['compose']})
+        return response.content.strip()
+
+    async def draft(self, offer, kwargs):
+        return await self.compose(offer, **{**kwargs(), 'text': self.engine.speculator.placeholder})
+
+    def speculate(self, offers):
+        if self.speculative:
+            self.engine.speculator.speculate(
+                self.thread,
+                self.name,
+                {label: functools.partial(self.draft, offer, kwargs) for label, (offer, kwargs) in offers.items()}
+            )
+
+    async def negotiate(self, prompt, state, offers):
+        if self.combined and offers and not self.speculative:
+            behaviour, text = await self.engine.detect_and_compose(prompt, state.get('message'), offers)
+        else:
+            behaviour, text = await self.detect_behaviour(prompt, state), None
+
+        if self.speculative:
+            text = await self.engine.speculator.claim(self.thread, self.name, behaviour)
 
-    @staticmethod
-    def condition_start_price(state):
-        client_cpm = int(state.get("client_cpm", 0))
-        min_views = int(state.get("min_views", 0))
-        influencer_price = int(state.get("influencer_price", 0))
+        if text is None and behaviour in offers:
+            offer, kwargs = offers[behaviour]
+            text = await self.compose(offer, **kwargs())
 
-        return influencer_price <= (client_cpm * min_views) / 1000
+        return behaviour, text
 
     @abstractmethod
     async def __call__(self, state: State):
@@ -32,3 +79,4 @@ class Node(ABC):
 
     def __init__(self, engine):
         self.engine = engine
+        self.engine.prompts.register(self)
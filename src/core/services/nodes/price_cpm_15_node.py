@@ -1,8 +1,7 @@
 from typing import Literal
 
 from langgraph.types import Command, interrupt
-from langchain.schema import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 from .node import Node, State
 
@@ -20,23 +19,47 @@ class PriceCPM15Node(Node):
         )
     )
 
+    prompt_offer_fix_price = PromptTemplate(
+        input_variables=["fix_price", "text"],
+        template=(
+            "Compose a professional and persuasive message to the influencer, offering a collaboration based on a fixed-price model. "
+            "Highlight the advantages of this payment structure and emphasize that it reflects their value and ensures a reliable and transparent partnership. "
+            "Clearly specify the fixed price for the collaboration.\n\n"
+            "Details:\n"
+            "- Fixed Price: {fix_price}\n"
+            "- Previous user's message: {text}\n\n"
+            "Response:"
+        )
+    )
+
     async def __call__(self, state: State) -> Command[Literal['END', 'PRICE_FIX']]:
+        ladder = self.ladder(state)
+        offers = {
+            'LOW_CPM': (
+                self.prompt_offer_fix_price,
+                lambda: dict(
+                    fix_price=ladder.fixes[0],
+                    text=state.get('message')
+                )
+            )
+        }
+
+        self.speculate(offers)
+
         response = interrupt({})
         state.update({'message': response.get('message', state['message'])})
 
-        message = HumanMessage(
-            content=self.prompt_detect_behaviour_cpm_15.format(
-                text=state.get("message")
-            )
-        )
+        behaviour, text = await self.negotiate(self.prompt_detect_behaviour_cpm_15, state, offers)
 
-        match (await self.engine.llm.ainvoke(message.content)).content.strip():
+        match behaviour:
 
             case 'AGREEMENT':
 
-                self.engine.cpm = True
+                state.update({'cpm': True})
                 return Command(update=state, goto='END')
 
             case 'LOW_CPM':
 
+                state.update({'message': text, 'influencer_price': str(ladder.fixes[0])})
+
                 return Command(update=state, goto='PRICE_FIX')
@@ -1,8 +1,7 @@
 from typing import Literal
 
 from langgraph.types import Command, interrupt
-from langchain.schema import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 from .node import Node, State
 
@@ -34,31 +33,33 @@ class PriceCPMCapNode(Node):
     )
 
     async def __call__(self, state: State) -> Command[Literal['END', 'PRICE_FIX']]:
+        ladder = self.ladder(state)
+        offers = {
+            'LOW_CAP': (
+                self.prompt_offer_fix_price,
+                lambda: dict(
+                    fix_price=ladder.fixes[0],
+                    text=state.get('message')
+                )
+            )
+        }
+
+        self.speculate(offers)
+
         response = interrupt({})
         state.update({'message': response.get('message', state['message'])})
 
-        message = HumanMessage(
-            content=self.prompt_detect_behaviour_cpm_cap.format(
-                text=state.get("message")
-            )
-        )
+        behaviour, text = await self.negotiate(self.prompt_detect_behaviour_cpm_cap, state, offers)
 
-        match (await self.engine.llm.ainvoke(message.content)).content.strip():
+        match behaviour:
 
             case 'AGREEMENT':
 
-                self.engine.cpm = True
+                state.update({'cpm': True})
                 return Command(update=state, goto='END')
 
             case 'LOW_CAP':
 
-                message = HumanMessage(
-                    content=self.prompt_offer_fix_price.format(
-                        fix_price=int(self._calc_cap(state)),
-                        text=state.get('message')
-                    )
-                )
-                text = (await self.engine.llm.ainvoke(message.content)).content.strip()
-                state.update({'message': text, 'influencer_price': self._calc_cap(state)})
+                state.update({'message': text, 'influencer_price': str(ladder.fixes[0])})
 
-                return Command(update=state, goto='PRICE_FIX')
\ No newline at end of file
+                return Command(update=state, goto='PRICE_FIX')
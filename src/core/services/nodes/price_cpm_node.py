@@ -1,8 +1,7 @@
 from typing import Literal
 
 from langgraph.types import Command, interrupt
-from langchain.schema import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 from .node import Node, State
 
@@ -65,68 +64,68 @@ class PriceCPMNode(Node):
     )
 
     async def __call__(self, state: State) -> Command[Literal['END', 'PRICE_CPM_CAP', 'PRICE_CPM_15', 'PRICE_FIX']]:
+        ladder = self.ladder(state)
+        offers = {
+            'NO_CPM': (
+                self.prompt_offer_fix_price,
+                lambda: dict(
+                    fix_price=ladder.fixes[0],
+                    text=state.get('message')
+                )
+            ),
+            'LOW_CAP': (
+                self.prompt_offer_cpm_cap,
+                lambda: dict(
+                    client_price=ladder.cpm,
+                    new_cap=ladder.raised_cap,
+                    text=state.get('message')
+                )
+            ),
+            'LOW_CPM': (
+                self.prompt_offer_cpm_15,
+                lambda: dict(
+                    client_price=ladder.cpm,
+                    cap=ladder.raised_cpm_cap,
+                    text=state.get('message'),
+                    new_cpm=ladder.raised_cpm
+                )
+            )
+        }
+
+        self.speculate(offers)
+
         response = interrupt({})
         state.update({'message': response.get('message', state['message'])})
 
-        message = HumanMessage(
-            content=self.prompt_detect_behaviour_cpm.format(
-                text=state.get("message")
-            )
-        )
+        behaviour, text = await self.negotiate(self.prompt_detect_behaviour_cpm, state, offers)
 
-        match (await self.engine.llm.ainvoke(message.content)).content.strip():
+        match behaviour:
 
             case 'AGREEMENT':
 
-                self.engine.cpm = True
+                state.update({'cpm': True})
                 return Command(update=state, goto='END')
 
             case 'NO_CPM':
 
-                message = HumanMessage(
-                    content=self.prompt_offer_fix_price.format(
-                        fix_price=self._calc_cap(state),
-                        text=state.get('message')
-                    )
-                )
-                text = (await self.engine.llm.ainvoke(message.content)).content.strip()
-                state.update({'message': text})
+                state.update({'message': text, 'influencer_price': str(ladder.fixes[0])})
 
                 return Command(update=state, goto='PRICE_FIX')
 
             case 'LOW_CAP':
 
-                message = HumanMessage(
-                    content=self.prompt_offer_cpm_cap.format(
-                        client_price=int(state.get('client_cpm')),
-                        new_cap=1.3 * int(self._calc_cap(state)),
-                        text=state.get('message')
-                    )
-                )
-                text = (await self.engine.llm.ainvoke(message.content)).content.strip()
-                state.update({'message': text})
+                state.update({'message': text, 'influencer_price': str(ladder.raised_cap)})
 
                 return Command(update=state, goto='PRICE_CPM_CAP')
 
             case 'LOW_CPM':
 
-                message = HumanMessage(
-                    content=self.prompt_offer_cpm_15.format(
-                        client_price=int(state.get('client_cpm')),
-                        cap=1.15 * int(self._calc_cap(state)),
-                        text=state.get('message'),
-                        new_cpm=int(state.get('client_cpm')) * 1.15
-                    )
-                )
-                text = (await self.engine.llm.ainvoke(message.content)).content.strip()
                 state.update(
                     {
                         'message': text,
-                        'client_cpm': str(int(state.get('client_cpm')) * 1.15),
-                        'influencer_price': str(1.15 * int(self._calc_cap(state)))
+                        'client_cpm': str(ladder.raised_cpm),
+                        'influencer_price': str(ladder.raised_cpm_cap)
                     }
                 )
 
                 return Command(update=state, goto='PRICE_CPM_15')
-            
-            
\ No newline at end of file
@@ -1,8 +1,7 @@
 from typing import Literal
 
 from langgraph.types import Command, interrupt
-from langchain.schema import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 from .node import Node, State
 
@@ -36,16 +35,26 @@ class PriceFix20Node(Node):
 
     async def __call__(self, state: State) -> Command[Literal['END', 'PRICE_FIX_30']]:
 
+        ladder = self.ladder(state)
+        offers = {
+            'LOW_FIX_PRICE': (
+                self.prompt_offer_fix_price_30,
+                lambda: dict(
+                    original_price=ladder.fixes[0],
+                    text=state.get('message'),
+                    new_fix_price=ladder.fixes[2],
+                )
+            )
+        }
+
+        self.speculate(offers)
+
         response = interrupt({})
         state.update({'message': response.get('message', state['message'])})
 
-        message = HumanMessage(
-            content=self.prompt_detect_behaviour_fix_price_20.format(
-                text=state.get("message")
-            )
-        )
+        behaviour, text = await self.negotiate(self.prompt_detect_behaviour_fix_price_20, state, offers)
 
-        match (await self.engine.llm.ainvoke(message.content)).content.strip():
+        match behaviour:
 
             case 'AGREEMENT':
 
@@ -53,14 +62,6 @@ class PriceFix20Node(Node):
 
             case 'LOW_FIX_PRICE':
 
-                message = HumanMessage(
-                    content=self.prompt_offer_fix_price_30.format(
-                        original_price=int(self._calc_cap(state)),
-                        text=state.get('message'),
-                        new_fix_price=1.3 * int(self._calc_cap(state)),
-                    )
-                )
-                text = (await self.engine.llm.ainvoke(message.content)).content.strip()
-                state.update({'message': text, 'influencer_price': str(1.3 * int(self._calc_cap(state)))})
+                state.update({'message': text, 'influencer_price': str(ladder.fixes[2])})
 
                 return Command(update=state, goto='PRICE_FIX_30')
@@ -1,8 +1,7 @@
 from typing import Literal
 
 from langgraph.types import Command, interrupt
-from langchain.schema import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 from .node import Node, State
 
@@ -25,17 +24,11 @@ class PriceFix30Node(Node):
         response = interrupt({})
         state.update({'message': response.get('message', state['message'])})
 
-        message = HumanMessage(
-            content=self.prompt_detect_behaviour_fix_price_30.format(
-                text=state.get("message")
-            )
-        )
-
-        match (await self.engine.llm.ainvoke(message.content)).content.strip():
+        match await self.detect_behaviour(self.prompt_detect_behaviour_fix_price_30, state):
 
             case 'AGREEMENT':
                 return Command(update=state, goto='END')
 
             case 'LOW_FIX_PRICE':
-                self.engine.success = False
+                state.update({'success': False})
                 return Command(update=state, goto='END')
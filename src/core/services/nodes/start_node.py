@@ -1,8 +1,8 @@
 from typing import Literal
 
 from langgraph.types import Command
-from langchain.schema import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import PromptTemplate
 
 from .node import Node, State
 
@@ -45,29 +45,36 @@ class StartNode(Node):
 
     async def __call__(self, state: State) -> Command[Literal['END', 'NO_PRICE', 'PRICE_CPM']]:
 
-        message = HumanMessage(
-            content=self.prompt_find_price.format(
-                text=state.get('message')
-            )
-        )
-        influencer_price = (await self.engine.llm.ainvoke(message.content)).content.strip()
-        state.update({'influencer_price': influencer_price})
+        influencer_price = self.engine.extractor.number(state.get('message'), 'price')
 
-        if influencer_price == '0':
+        if influencer_price is None:
 
             message = HumanMessage(
-                content=self.prompt_no_price.format(
+                content=self.engine.prompts.format(
+                    self.prompt_find_price,
                     text=state.get('message')
                 )
             )
-            text = (await self.engine.llm.ainvoke(message.content)).content.strip()
+            influencer_price = await self.engine.ainvoke_cached(message.content, 'extract')
+
+        influencer_price = str(influencer_price)
+        state.update({'influencer_price': influencer_price})
+
+        if influencer_price == '0':
+
+            text = await self.compose(
+                self.prompt_no_price,
+                text=state.get('message')
+            )
             state.update({'message': text})
 
             return Command(update=state, goto='NO_PRICE')
 
         else:
 
-            match self.condition_start_price(state):
+            ladder = self.ladder(state)
+
+            match ladder.accepts(influencer_price):
 
                 case True:
 
@@ -75,14 +82,12 @@ class StartNode(Node):
 
                 case False:
 
-                    message = HumanMessage(
-                        content=self.prompt_offer_cpm.format(
-                            client_price=int(state.get('client_cpm')),
-                            cap=self._calc_cap(state),
-                            text=state.get('message')
-                        )
+                    text = await self.compose(
+                        self.prompt_offer_cpm,
+                        client_price=ladder.cpm,
+                        cap=ladder.cap,
+                        text=state.get('message')
                     )
-                    text = (await self.engine.llm.ainvoke(message.content)).content.strip()
-                    state.update({'message': text, 'influencer_price': self._calc_cap(state)})
+                    state.update({'message': text, 'influencer_price': str(ladder.cap)})
 
                     return Command(update=state, goto='PRICE_CPM')
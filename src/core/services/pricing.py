@@ -0,0 +1,61 @@
+import dataclasses
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+
+
+def number(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value).strip())
+
+
+@dataclasses.dataclass(frozen=True)
+class Ladder:
+    inputs: tuple
+    cpm: Decimal
+    budget: Decimal
+    cap: Decimal
+    raised_cap: Decimal
+    raised_cpm: Decimal
+    raised_cpm_cap: Decimal
+    fixes: tuple
+
+    def accepts(self, price) -> bool:
+        return number(price) <= self.budget
+
+
+@dataclasses.dataclass(frozen=True)
+class PricingPolicy:
+    start_divisor: Decimal = Decimal(1000)
+    cap_divisor: Decimal = Decimal(4000)
+    cap_weight: Decimal = Decimal(3)
+    cap_raise: Decimal = Decimal('1.3')
+    cpm_raise: Decimal = Decimal('1.15')
+    fix_raises: tuple = (Decimal('1.0'), Decimal('1.2'), Decimal('1.3'))
+    money: Decimal = Decimal('1')
+    rate: Decimal = Decimal('0.01')
+
+    def __post_init__(self):
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            value = tuple(map(number, value)) if isinstance(value, (tuple, list)) else number(value)
+            object.__setattr__(self, field.name, value)
+
+    def amount(self, value: Decimal) -> Decimal:
+        return value.quantize(self.money, ROUND_HALF_UP)
+
+    @staticmethod
+    def plain(value: Decimal) -> Decimal:
+        return value.quantize(Decimal(1)) if value == value.to_integral_value() else value.normalize()
+
+    def ladder(self, client_cpm, min_views, max_views) -> Ladder:
+        cpm, low, high = number(client_cpm), number(min_views), number(max_views)
+        cap = (cpm / self.cap_divisor * (low + self.cap_weight * high)).quantize(self.money, ROUND_DOWN)
+
+        return Ladder(
+            inputs=(client_cpm, min_views, max_views),
+            cpm=cpm,
+            budget=cpm * low / self.start_divisor,
+            cap=cap,
+            raised_cap=self.amount(cap * self.cap_raise),
+            raised_cpm=self.plain((cpm * self.cpm_raise).quantize(self.rate, ROUND_HALF_UP)),
+            raised_cpm_cap=self.amount(cap * self.cpm_raise),
+            fixes=tuple(self.amount(cap * factor) for factor in self.fix_raises)
+        )
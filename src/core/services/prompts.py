@@ -0,0 +1,112 @@
+import collections
+import logging
+import re
+import string
+from typing import Optional
+
+from langchain_core.prompts import PromptTemplate
+
+
+logger = logging.getLogger(__name__)
+
+pattern_token = re.compile(r"\w+|[^\w\s]")
+
+
+class PromptRegistry:
+
+    def __init__(self, budget: int = 0, tokenizer: Optional[str] = None, metrics=None):
+        self.budget = budget
+        self.tokenizer = tokenizer
+        self.metrics = metrics
+        self.prefixes = []
+        self.templates = {}
+        self.counters = collections.Counter()
+        self.encoding = None
+
+    def load(self):
+        # blocks while tiktoken downloads the BPE file on a cold container, so Engine.warm runs it off the event loop
+        if self.tokenizer and self.encoding is None:
+            try:
+                import tiktoken
+
+                self.encoding = tiktoken.get_encoding(self.tokenizer)
+
+            except Exception as exception:
+                logger.warning('tokenizer %s is unavailable, counting tokens approximately: %r', self.tokenizer, exception)
+                self.tokenizer = None
+
+        return self.encoding
+
+    def register(self, owner):
+        for scope in (*reversed(type(owner).__mro__), owner):
+            for name, value in vars(scope).items():
+                if isinstance(value, PromptTemplate):
+                    prefix = self.prefix(value)
+                    self.templates[name] = value
+
+                    if prefix and (prefix, name) not in self.prefixes:
+                        self.prefixes.append((prefix, name))
+
+        self.prefixes.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    @staticmethod
+    def prefix(prompt: PromptTemplate) -> str:
+        return next(string.Formatter().parse(prompt.template), ('',))[0]
+
+    def name(self, text) -> str:
+        text = text if isinstance(text, str) else str(text)
+        return next((name for prefix, name in self.prefixes if text.startswith(prefix)), 'unknown')
+
+    @staticmethod
+    def approximate(text: str) -> int:
+        return len(pattern_token.findall(text))
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+
+        return self.approximate(text)
+
+    def truncate(self, text: Optional[str]) -> Optional[str]:
+        # every token covers at least one character, so short messages skip the tokenizer
+        if not self.budget or not text or len(text) <= self.budget:
+            return text
+
+        tokens = self.count(text)
+
+        if tokens <= self.budget:
+            return text
+
+        keep = len(text) * self.budget // tokens
+        self.counters['truncated'] += 1
+
+        if self.metrics is not None:
+            self.metrics.inc('prompt_truncations_total')
+
+        return f"{text[:keep * 2 // 3].rstrip()} […] {text[len(text) - keep // 3:].lstrip()}"
+
+    def format(self, prompt: PromptTemplate, **kwargs) -> str:
+        if 'text' in kwargs:
+            kwargs['text'] = self.truncate(kwargs['text'])
+
+        content = prompt.format(**kwargs)
+
+        if self.metrics is not None:
+            # approximate on purpose: exact counts per call arrive with the response as llm_tokens_total
+            self.metrics.inc('prompt_tokens_total', self.approximate(content), prompt=self.name(content))
+
+        return content
+
+    def report(self) -> list:
+        rows = []
+
+        for name, prompt in sorted(self.templates.items()):
+            fields = [field for _, field, _, _ in string.Formatter().parse(prompt.template) if field]
+            rows.append({
+                'prompt': name,
+                'prefix_tokens': self.count(self.prefix(prompt)),
+                'static_tokens': self.count(prompt.template.format(**{field: '' for field in fields})),
+                'variables': fields
+            })
+
+        return rows
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Optional
+
+from .client import LLMClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class Router:
+    tasks = ('extract', 'classify', 'compose', 'confirm')
+    evaluated = ('extract', 'classify')
+
+    def __init__(
+        self,
+        clients: dict,
+        reference: Optional[LLMClient] = None,
+        rate: float = 0.0,
+        path: Optional[str] = None,
+        metrics=None
+    ):
+        self.clients = clients
+        self.reference = reference
+        self.rate = rate
+        self.path = path
+        self.metrics = metrics
+        self.pending = set()
+
+    def __getitem__(self, task: str) -> LLMClient:
+        return self.clients[task]
+
+    def items(self):
+        return self.clients.items()
+
+    def shadow(self, task: str, content: str, response: str):
+        if self.reference is None or task not in self.evaluated or random.random() >= self.rate:
+            return
+
+        if self.reference.model_name == self.clients[task].model_name:
+            return
+
+        evaluation = asyncio.create_task(self._evaluate(task, content, response))
+        self.pending.add(evaluation)
+        evaluation.add_done_callback(self.pending.discard)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return ' '.join(text.strip().strip('.').upper().split())
+
+    async def _evaluate(self, task, content, response):
+        try:
+            reference = (await self.reference.ainvoke(content)).content.strip()
+
+        except Exception as exception:
+            logger.warning('shadow %s call failed: %r', task, exception)
+            return
+
+        agree = self._normalize(response) == self._normalize(reference)
+
+        if self.metrics is not None:
+            self.metrics.inc('llm_eval_total', task=task, agree=str(agree).lower())
+
+        if self.path and not agree:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({
+                    'task': task,
+                    'model': self.clients[task].model_name,
+                    'reference_model': self.reference.model_name,
+                    'response': response,
+                    'reference': reference,
+                    'prompt': content
+                }, ensure_ascii=False) + '\n')
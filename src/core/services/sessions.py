@@ -0,0 +1,73 @@
+import collections
+import dataclasses
+import os
+import time
+from typing import Optional
+
+
+@dataclasses.dataclass
+class Session:
+    user_id: int
+    interrupted: bool = False
+    touched: float = dataclasses.field(default_factory=time.monotonic)
+    trace_id: str = dataclasses.field(default_factory=lambda: os.urandom(16).hex())
+    drafted: Optional[str] = None
+    drafts: dict = dataclasses.field(default_factory=dict)
+    ladder: Optional[object] = None
+
+    def discard(self):
+        for draft in self.drafts.values():
+            draft.task.cancel()
+
+        self.drafts.clear()
+        self.drafted = None
+
+
+class SessionRegistry:
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sessions = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    @staticmethod
+    def _key(user_id) -> str:
+        # handlers pass the int user id, graph nodes read thread_id back from the run config
+        return str(user_id)
+
+    def _evict(self):
+        now = time.monotonic()
+
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+
+            if len(self.sessions) <= self.maxsize and now - session.touched < self.ttl:
+                break
+
+            # its drafts would keep holding llm slots and rate tokens for a reply nobody will claim
+            self.sessions.popitem(last=False)[1].discard()
+
+    def get(self, user_id) -> Optional[Session]:
+        self._evict()
+        key = self._key(user_id)
+        session = self.sessions.get(key)
+
+        if session is not None:
+            session.touched = time.monotonic()
+            self.sessions.move_to_end(key)
+
+        return session
+
+    def create(self, user_id, **kwargs) -> Session:
+        key = self._key(user_id)
+        self.sessions[key] = session = Session(user_id, **kwargs)
+        self.sessions.move_to_end(key)
+        self._evict()
+
+        return session
+
+    def pop(self, user_id) -> Optional[Session]:
+        return self.sessions.pop(self._key(user_id), None)
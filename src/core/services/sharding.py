@@ -0,0 +1,252 @@
+import asyncio
+import bisect
+import collections
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import os
+import secrets
+import struct
+from typing import Optional
+
+from aiohttp import web
+
+from .webhook import chat_of
+from .workers import ChatWorkerPool
+
+
+logger = logging.getLogger(__name__)
+
+header = struct.Struct('>I')
+accepted, rejected = b'\x01', b'\x00'
+
+
+def user_of(update: dict):
+    for event in update.values():
+        if isinstance(event, dict) and 'from' in event:
+            return event['from'].get('id')
+
+    return chat_of(update)
+
+
+def socket_path(directory: str, shard: int) -> str:
+    return os.path.join(directory, f'shard-{shard}.sock')
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    size, = header.unpack(await reader.readexactly(header.size))
+
+    return await reader.readexactly(size)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(header.pack(len(payload)) + payload)
+
+
+class HashRing:
+
+    def __init__(self, shards: int, replicas: int = 64):
+        points = sorted((self._hash(f'{shard}:{replica}'), shard) for shard in range(shards) for replica in range(replicas))
+        self.shards = shards
+        self.points = [point for point, _ in points]
+        self.owners = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(value) -> int:
+        return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+    def shard(self, key) -> int:
+        return self.owners[bisect.bisect(self.points, self._hash(key)) % len(self.points)]
+
+
+class ShardServer:
+
+    def __init__(self, directory: str, shard: int, dispatcher, bot, pool: ChatWorkerPool):
+        self.path = socket_path(directory, shard)
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.pool = pool
+        self.server = None
+        self.writers = set()
+
+    async def start(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+        self.server = await asyncio.start_unix_server(self._serve, self.path)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+
+            for writer in list(self.writers):
+                writer.close()
+
+            await self.server.wait_closed()
+
+    def submit(self, update: dict) -> bool:
+        return self.pool.submit(chat_of(update), functools.partial(self.dispatcher.feed_raw_update, self.bot), update)
+
+    async def _serve(self, reader, writer):
+        self.writers.add(writer)
+
+        try:
+            while True:
+                update = json.loads(await read_frame(reader))
+                writer.write(accepted if self.submit(update) else rejected)
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+
+class ShardClient:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reader = self.writer = None
+        self.waiting = collections.deque()
+        self.connecting = asyncio.Lock()
+        self.receiving = None
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        async with self.connecting:
+            if self.connected:
+                return
+
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+            self.receiving = asyncio.create_task(self._receive(self.reader, self.writer, self.waiting))
+
+    async def _receive(self, reader, writer, waiting):
+        try:
+            while True:
+                status = await reader.readexactly(1)
+                waiting.popleft().set_result(status == accepted)
+
+        except (asyncio.IncompleteReadError, ConnectionError) as error:
+            while waiting:
+                waiting.popleft().set_exception(ConnectionError(f'{self.path} closed: {error!r}'))
+
+        finally:
+            writer.close()
+
+    async def forward(self, payload: bytes) -> bool:
+        if not self.connected:
+            await self.connect()
+
+        # frames and replies stay in the same order on one connection, which keeps every chat in order
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append(future)
+        write_frame(self.writer, payload)
+        await self.writer.drain()
+
+        return await future
+
+    async def close(self):
+        if self.connected:
+            self.writer.close()
+
+
+class Supervisor:
+
+    def __init__(
+        self,
+        command: list,
+        shards: int,
+        directory: str,
+        secret: Optional[str] = None,
+        backoff: float = 1.0,
+        boot_timeout: float = 120.0
+    ):
+        self.command = command
+        self.ring = HashRing(shards)
+        self.directory = directory
+        self.secret = secret
+        self.backoff = backoff
+        self.boot_timeout = boot_timeout
+        self.clients = [ShardClient(socket_path(directory, shard)) for shard in range(shards)]
+        self.processes = {}
+        self.tasks = set()
+        self.counters = collections.Counter()
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        for shard in range(self.ring.shards):
+            task = asyncio.create_task(self._keep(shard))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*(self._boot(client) for client in self.clients)), self.boot_timeout)
+
+        except asyncio.TimeoutError:
+            logger.warning('Not every shard is up after %.0fs, serving anyway', self.boot_timeout)
+
+    @staticmethod
+    async def _boot(client: ShardClient):
+        while not client.connected:
+            try:
+                await client.connect()
+
+            except OSError:
+                await asyncio.sleep(0.1)
+
+    async def _keep(self, shard: int):
+        while True:
+            self.processes[shard] = process = await asyncio.create_subprocess_exec(
+                *self.command,
+                env={**os.environ, 'SHARD': str(shard), 'SHARDS': str(self.ring.shards), 'SHARD_SOCKET_DIR': self.directory}
+            )
+            code = await process.wait()
+            logger.warning('Shard %d exited with %s, restarting', shard, code)
+            await asyncio.sleep(self.backoff)
+
+    async def stop(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+        for client in self.clients:
+            await client.close()
+
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+
+        await asyncio.gather(*(process.wait() for process in self.processes.values()))
+
+    async def forward(self, payload: bytes) -> bool:
+        shard = self.ring.shard(user_of(json.loads(payload)))
+
+        try:
+            forwarded = await self.clients[shard].forward(payload)
+
+        except OSError as error:
+            logger.warning('Shard %d is unavailable: %r', shard, error)
+            forwarded = False
+
+        self.counters[shard, forwarded] += 1
+
+        return forwarded
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not secrets.compare_digest(request.headers.get('X-Telegram-Bot-Api-Secret-Token', '').encode(), self.secret.encode()):
+            return web.Response(status=401)
+
+        if not await self.forward(await request.read()):
+            return web.Response(status=503, headers={'Retry-After': '1'})
+
+        return web.json_response({})
+
+    def register(self, application: web.Application, path: str):
+        application.router.add_post(path, self.handle)
@@ -0,0 +1,118 @@
+import dataclasses
+
+import numpy
+
+from .pricing import PricingPolicy
+
+
+OBJECTIONS = ('LOW_CAP', 'LOW_CPM', 'NO_CPM')
+
+ROUTES = {
+    'NO_CPM': 'START>PRICE_CPM',
+    'LOW_CAP': 'START>PRICE_CPM>PRICE_CPM_CAP',
+    'LOW_CPM': 'START>PRICE_CPM>PRICE_CPM_15'
+}
+
+LADDER = ('PRICE_FIX', 'PRICE_FIX_20', 'PRICE_FIX_30')
+
+PATHS = (
+    'START>NO_PRICE',
+    'START>END',
+    'START>PRICE_CPM>END',
+    'START>PRICE_CPM>PRICE_CPM_CAP>END',
+    'START>PRICE_CPM>PRICE_CPM_15>END',
+    *(
+        '>'.join((ROUTES[objection], *LADDER[:step + 1], 'END')) + (' (failed)' if step == len(LADDER) else '')
+        for objection in OBJECTIONS
+        for step in (*range(len(LADDER)), len(LADDER))
+    )
+)
+
+
+@dataclasses.dataclass
+class Simulation:
+    path: numpy.ndarray
+    price: numpy.ndarray
+    success: numpy.ndarray
+
+    def paths(self) -> numpy.ndarray:
+        return numpy.asarray(PATHS, dtype=object)[self.path]
+
+    def summary(self) -> dict:
+        counts = numpy.bincount(self.path, minlength=len(PATHS))
+        agreed = self.price[self.success]
+
+        return {
+            'rows': int(self.path.size),
+            'success_rate': round(float(self.success.mean()), 4) if self.path.size else 0.0,
+            'mean_price': round(float(agreed.mean()), 2) if agreed.size else 0.0,
+            'total_price': round(float(agreed.sum()), 2),
+            'paths': {PATHS[index]: int(count) for index, count in enumerate(counts) if count}
+        }
+
+
+def simulate(client_cpm, min_views, max_views, influencer_price, objection='NO_CPM', policy: PricingPolicy = PricingPolicy()) -> Simulation:
+    cpm, low, high, ask = (numpy.asarray(column, dtype=numpy.float64) for column in (client_cpm, min_views, max_views, influencer_price))
+    objection = numpy.broadcast_to(numpy.asarray(objection), ask.shape)
+    start_divisor, cap_divisor, cap_weight, cap_raise, cpm_raise = (
+        float(value) for value in (policy.start_divisor, policy.cap_divisor, policy.cap_weight, policy.cap_raise, policy.cpm_raise)
+    )
+    money = float(policy.money)
+
+    if len(policy.fix_raises) != len(LADDER):
+        raise ValueError(f'fix_raises needs one factor per stage of {LADDER}')
+
+    path = numpy.zeros(ask.shape, dtype=numpy.int16)
+    price = numpy.zeros(ask.shape)
+    success = numpy.zeros(ask.shape, dtype=bool)
+
+    def settle(mask, index, offer):
+        path[mask] = index
+        price[mask] = offer[mask] if isinstance(offer, numpy.ndarray) else offer
+        success[mask] = True
+
+    def cap_of(rate):
+        return numpy.floor(rate / cap_divisor * (low + cap_weight * high) / money) * money
+
+    def amount(value):
+        return numpy.floor(value / money + 0.5) * money
+
+    priced = ask > 0
+    instant = priced & (ask <= cpm * low / start_divisor)
+    settle(instant, 1, ask)
+
+    cap = cap_of(cpm)
+    negotiating = priced & ~instant
+    settle(negotiating & (cap >= ask), 2, cap)
+    rejected = negotiating & (cap < ask)
+
+    if not numpy.isin(objection[rejected], OBJECTIONS).all():
+        raise ValueError(f'objection must be one of {OBJECTIONS}')
+
+    fix = cap.copy()
+
+    for objection_index, name in enumerate(OBJECTIONS):
+        route = rejected & (objection == name)
+
+        if name == 'LOW_CAP':
+            raised = amount(cap * cap_raise)
+            settle(route & (raised >= ask), 3, raised)
+            route &= raised < ask
+
+        elif name == 'LOW_CPM':
+            raised = amount(cap * cpm_raise)
+            settle(route & (raised >= ask), 4, raised)
+            route &= raised < ask
+            fix = numpy.where(route, cap_of(cpm * cpm_raise), fix)
+
+        first = 5 + objection_index * (len(LADDER) + 1)
+
+        for step, factor in enumerate(policy.fix_raises):
+            offer = amount(fix * float(factor))
+            accepted = route & (offer >= ask)
+            settle(accepted, first + step, offer)
+            route &= ~accepted
+
+        path[route] = first + len(LADDER)
+
+    return Simulation(path, price, success)
@@ -0,0 +1,72 @@
+import asyncio
+import contextvars
+import dataclasses
+import time
+from typing import Optional
+
+
+@dataclasses.dataclass
+class Draft:
+    task: asyncio.Task
+    expires: float
+
+
+class Speculator:
+    placeholder = '(no reply yet; do not quote or refer to it)'
+
+    def __init__(self, sessions, ttl: float, metrics=None):
+        self.sessions = sessions
+        self.ttl = ttl
+        self.metrics = metrics
+
+    def _count(self, result):
+        if self.metrics is not None:
+            self.metrics.inc('speculation_total', result=result)
+
+    def speculate(self, user_id, node: str, drafts: dict):
+        session = self.sessions.get(user_id)
+
+        if session is None or session.drafted == node:
+            return
+
+        self.discard(user_id)
+        session.drafted = node
+        expires = time.monotonic() + self.ttl
+
+        for label, compose in drafts.items():
+            task = asyncio.get_running_loop().create_task(compose(), context=contextvars.Context())
+            session.drafts[label] = Draft(task, expires)
+
+    async def claim(self, user_id, node: str, label: str) -> Optional[str]:
+        session = self.sessions.get(user_id)
+
+        if session is None or session.drafted != node:
+            return None
+
+        draft = session.drafts.pop(label, None)
+        self.discard(user_id)
+
+        if draft is None:
+            self._count('unused')
+            return None
+
+        if draft.expires < time.monotonic():
+            draft.task.cancel()
+            self._count('expired')
+            return None
+
+        try:
+            text = await draft.task
+
+        except Exception:
+            self._count('failed')
+            return None
+
+        self._count('hit')
+        return text
+
+    def discard(self, user_id):
+        session = self.sessions.get(user_id)
+
+        if session is not None:
+            session.discard()
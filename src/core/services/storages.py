@@ -0,0 +1,331 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import json
+import sqlite3
+from abc import abstractmethod
+from typing import Optional
+
+import aiogram
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder
+
+
+def merge(data: dict, changes: dict) -> dict:
+    # JSON merge patch, the rule SQLite's json_patch applies: None drops a field, nested dicts merge
+    merged = dict(data)
+
+    for field, value in changes.items():
+        if value is None:
+            merged.pop(field, None)
+
+        elif isinstance(value, dict):
+            merged[field] = merge(merged[field] if isinstance(merged.get(field), dict) else {}, value)
+
+        else:
+            merged[field] = value
+
+    return merged
+
+
+class RecordStorage(BaseStorage):
+    scope = contextvars.ContextVar('storage_scope', default=None)
+
+    def __init__(self, key_builder: Optional[KeyBuilder] = None):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.counters = collections.Counter()
+
+    @abstractmethod
+    async def read(self, key: str) -> tuple:
+        pass
+
+    @abstractmethod
+    async def write_state(self, key: str, state: Optional[str]):
+        pass
+
+    @abstractmethod
+    async def write_data(self, key: str, data: dict):
+        pass
+
+    @abstractmethod
+    async def merge_data(self, key: str, changes: dict) -> tuple:
+        pass
+
+    @contextlib.asynccontextmanager
+    async def batch(self):
+        # reads are cached for the update, writes go straight through: the handler may run for seconds
+        # and a write-back at the end would revert whatever another update wrote in the meantime
+        if self.scope.get() is not None:
+            yield
+            return
+
+        token = self.scope.set({})
+
+        try:
+            yield
+
+        finally:
+            self.scope.reset(token)
+
+    async def _record(self, key) -> list:
+        records = self.scope.get()
+
+        if key not in records:
+            self.counters['reads'] += 1
+            records[key] = list(await self.read(key))
+
+        return records[key]
+
+    async def get_state(self, key):
+        async with self.batch():
+            return (await self._record(self.key_builder.build(key)))[0]
+
+    async def set_state(self, key, state=None):
+        async with self.batch():
+            key, state = self.key_builder.build(key), state.state if isinstance(state, State) else state
+            self.counters['writes'] += 1
+            await self.write_state(key, state)
+
+            if key in self.scope.get():
+                self.scope.get()[key][0] = state
+
+    async def get_data(self, key):
+        async with self.batch():
+            return dict((await self._record(self.key_builder.build(key)))[1])
+
+    async def set_data(self, key, data):
+        async with self.batch():
+            key, data = self.key_builder.build(key), dict(data)
+            self.counters['writes'] += 1
+            await self.write_data(key, data)
+
+            if key in self.scope.get():
+                self.scope.get()[key][1] = data
+
+    async def update_data(self, key, data):
+        async with self.batch():
+            # merged by the backend in one step, so concurrent updates of the same chat keep each other's fields;
+            # the record it returns is the freshest there is and replaces the cached one
+            key = self.key_builder.build(key)
+            self.counters['writes'] += 1
+            record = self.scope.get()[key] = list(await self.merge_data(key, dict(data)))
+
+            return dict(record[1])
+
+    async def close(self):
+        pass
+
+    def snapshot(self) -> Optional[dict]:
+        return None
+
+    def restore(self, snapshot: dict):
+        pass
+
+
+class MemoryRecordStorage(RecordStorage):
+
+    def __init__(self, key_builder: Optional[KeyBuilder] = None):
+        super().__init__(key_builder)
+        self.records = {}
+
+    async def read(self, key):
+        return self.records.get(key, (None, {}))
+
+    def _store(self, key, state, data):
+        if state is None and not data:
+            self.records.pop(key, None)
+        else:
+            self.records[key] = (state, data)
+
+    async def write_state(self, key, state):
+        self._store(key, state, self.records.get(key, (None, {}))[1])
+
+    async def write_data(self, key, data):
+        self._store(key, self.records.get(key, (None, {}))[0], data)
+
+    async def merge_data(self, key, changes):
+        state, data = self.records.get(key, (None, {}))
+        data = merge(data, changes)
+        self._store(key, state, data)
+
+        return state, data
+
+    def snapshot(self):
+        return {key: [state, data] for key, (state, data) in self.records.items()}
+
+    def restore(self, snapshot):
+        self.records.update((key, tuple(record)) for key, record in snapshot.items())
+
+
+class SQLiteRecordStorage(RecordStorage):
+
+    def __init__(self, path: str, pool_size: int = 4, key_builder: Optional[KeyBuilder] = None):
+        super().__init__(key_builder)
+        self.pool = asyncio.Queue()
+
+        for _ in range(pool_size):
+            connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, state TEXT, data TEXT)')
+            self.pool.put_nowait(connection)
+
+    async def _run(self, query, parameters=()):
+        connection = await self.pool.get()
+
+        try:
+            # fetchall, not fetchone: a RETURNING statement holds its write lock until it is read to the end
+            rows = await asyncio.to_thread(lambda: connection.execute(query, parameters).fetchall())
+            return rows[0] if rows else None
+
+        finally:
+            self.pool.put_nowait(connection)
+
+    async def read(self, key):
+        row = await self._run('SELECT state, data FROM fsm WHERE key = ?', (key,))
+        return (row[0], json.loads(row[1])) if row else (None, {})
+
+    async def _prune(self, key):
+        await self._run("DELETE FROM fsm WHERE key = ? AND state IS NULL AND data = '{}'", (key,))
+
+    async def write_state(self, key, state):
+        await self._run(
+            "INSERT INTO fsm (key, state, data) VALUES (?, ?, '{}') ON CONFLICT(key) DO UPDATE SET state = excluded.state",
+            (key, state)
+        )
+
+        if state is None:
+            await self._prune(key)
+
+    async def write_data(self, key, data):
+        await self._run(
+            'INSERT INTO fsm (key, state, data) VALUES (?, NULL, ?) ON CONFLICT(key) DO UPDATE SET data = excluded.data',
+            (key, json.dumps(data, ensure_ascii=False))
+        )
+
+        if not data:
+            await self._prune(key)
+
+    async def merge_data(self, key, changes):
+        state, data = await self._run(
+            'INSERT INTO fsm (key, state, data) VALUES (?, NULL, ?) '
+            'ON CONFLICT(key) DO UPDATE SET data = json_patch(fsm.data, ?) RETURNING state, data',
+            (key, json.dumps(merge({}, changes), ensure_ascii=False), json.dumps(changes, ensure_ascii=False))
+        )
+        data = json.loads(data)
+
+        if state is None and not data:
+            await self._prune(key)
+
+        return state, data
+
+    async def close(self):
+        while not self.pool.empty():
+            await asyncio.to_thread(self.pool.get_nowait().close)
+
+
+class RedisRecordStorage(RecordStorage):
+    # the same merge patch as storages.merge, run inside redis so the read and the write are one atomic step;
+    # cjson cannot tell an empty object from an empty list, so a nested dict merged down to nothing reads back as []
+    script_merge = """
+        local function merge(data, changes)
+            for field, value in pairs(changes) do
+                if value == cjson.null then
+                    data[field] = nil
+                elseif type(value) == 'table' then
+                    data[field] = merge(type(data[field]) == 'table' and data[field] or {}, value)
+                else
+                    data[field] = value
+                end
+            end
+            return data
+        end
+
+        local current = redis.call('GET', KEYS[2])
+        local data = merge(current and cjson.decode(current) or {}, cjson.decode(ARGV[1]))
+
+        if next(data) == nil then
+            redis.call('DEL', KEYS[2])
+            return {redis.call('GET', KEYS[1]), '{}'}
+        end
+
+        local encoded = cjson.encode(data)
+        redis.call('SET', KEYS[2], encoded)
+        return {redis.call('GET', KEYS[1]), encoded}
+    """
+
+    def __init__(self, redis, key_builder: Optional[KeyBuilder] = None):
+        super().__init__(key_builder)
+        self.redis = redis
+        self.script = redis.register_script(self.script_merge)
+
+    @classmethod
+    def from_url(cls, url: str, pool_size: int = 8, **kwargs) -> 'RedisRecordStorage':
+        from redis.asyncio import ConnectionPool, Redis
+
+        return cls(Redis(connection_pool=ConnectionPool.from_url(url, max_connections=pool_size)), **kwargs)
+
+    async def read(self, key):
+        state, data = await self.redis.mget(f'{key}:state', f'{key}:data')
+        state = state.decode() if isinstance(state, bytes) else state
+
+        return state, json.loads(data) if data else {}
+
+    async def write_state(self, key, state):
+        if state is None:
+            await self.redis.delete(f'{key}:state')
+        else:
+            await self.redis.set(f'{key}:state', state)
+
+    async def write_data(self, key, data):
+        if data:
+            await self.redis.set(f'{key}:data', json.dumps(data, ensure_ascii=False))
+        else:
+            await self.redis.delete(f'{key}:data')
+
+    async def merge_data(self, key, changes):
+        state, data = await self.script(keys=[f'{key}:state', f'{key}:data'], args=[json.dumps(changes, ensure_ascii=False)])
+        state = state.decode() if isinstance(state, bytes) else state
+
+        return state, json.loads(data)
+
+    async def close(self):
+        await self.redis.aclose(close_connection_pool=True)
+
+
+class ScopedDispatcher(aiogram.Dispatcher):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.running = {}
+
+    async def feed_update(self, bot, update, **kwargs):
+        storage = self.fsm.storage
+        task = asyncio.current_task()
+        self.running[task] = update
+
+        try:
+            if not isinstance(storage, RecordStorage):
+                return await super().feed_update(bot, update, **kwargs)
+
+            async with storage.batch():
+                return await super().feed_update(bot, update, **kwargs)
+
+        finally:
+            self.running.pop(task, None)
+
+    async def drain(self, timeout: float) -> list:
+        if self.running:
+            await asyncio.wait(list(self.running), timeout=timeout)
+
+        dropped = [update.update_id for update in self.running.values()]
+        cancelled = list(self.running)
+
+        for task in cancelled:
+            task.cancel()
+
+        if cancelled:
+            await asyncio.wait(cancelled)
+
+        return dropped
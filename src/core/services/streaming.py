@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+
+class ChatThrottle:
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last = {}
+
+    def ready(self, chat_id) -> bool:
+        return time.monotonic() - self.last.get(chat_id, 0.0) >= self.interval
+
+    async def wait(self, chat_id):
+        delay = self.interval - (time.monotonic() - self.last.get(chat_id, 0.0))
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def touch(self, chat_id):
+        now = time.monotonic()
+
+        if len(self.last) > 10_000:
+            self.last = {key: last for key, last in self.last.items() if now - last < self.interval}
+
+        self.last[chat_id] = now
+
+
+class StreamingMessage:
+
+    def __init__(self, message, throttle: ChatThrottle):
+        self.message = message
+        self.throttle = throttle
+        self.text = ''
+        self.shown = message.text or ''
+
+    async def edit(self, text: str):
+        if text.strip() and text != self.shown:
+            self.throttle.touch(self.message.chat.id)
+            self.message = await self.message.edit_text(text)
+            self.shown = text
+
+    def reset(self):
+        self.text = ''
+
+    async def feed(self, chunk: str):
+        self.text += chunk
+
+        if self.throttle.ready(self.message.chat.id):
+            await self.edit(self.text + ' …')
+
+    async def close(self, text: str):
+        await self.throttle.wait(self.message.chat.id)
+        await self.edit(text)
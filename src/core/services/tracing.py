@@ -0,0 +1,192 @@
+import contextlib
+import contextvars
+import json
+import os
+import time
+from typing import Optional
+
+import aiogram
+from langchain_core.callbacks import AsyncCallbackHandler
+from langgraph.errors import GraphInterrupt
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent', 'name', 'started', 'clock', 'attributes', 'status')
+
+    def __init__(self, name: str, trace_id: str, parent: Optional['Span'] = None, **attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.name = name
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        self.attributes = attributes
+        self.status = 'ok'
+
+    def record(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start': self.started,
+            'duration': time.perf_counter() - self.clock,
+            'status': self.status,
+            'attributes': self.attributes
+        }
+
+
+class Tracer:
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.current = contextvars.ContextVar('span', default=None)
+        self.file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    @staticmethod
+    def new_trace_id() -> str:
+        return os.urandom(16).hex()
+
+    def sampled(self, trace_id: str) -> bool:
+        return int(trace_id[:8], 16) < self.sample_rate * 0x100000000
+
+    def start(self, name: str, parent: Optional[Span] = None, trace_id: Optional[str] = None, **attributes) -> Span:
+        parent = parent or self.current.get()
+        trace_id = trace_id or (parent.trace_id if parent else self.new_trace_id())
+
+        return Span(name, trace_id, parent, **attributes)
+
+    def end(self, span: Span):
+        if self.sampled(span.trace_id):
+            self.file.write(json.dumps(span.record(), ensure_ascii=False, default=str) + '\n')
+
+    @contextlib.contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes):
+        span = self.start(name, trace_id=trace_id, **attributes)
+        token = self.current.set(span)
+
+        try:
+            yield span
+
+        except BaseException as error:
+            span.status = type(error).__name__
+            raise
+
+        finally:
+            self.current.reset(token)
+            self.end(span)
+
+    def adopt(self, trace_id: str):
+        span = self.current.get()
+
+        while span is not None:
+            span.trace_id = trace_id
+            span = span.parent
+
+    def close(self):
+        self.file.close()
+
+
+class TracingHandler(AsyncCallbackHandler):
+    run_inline = True
+    prices = ('client_cpm', 'influencer_price', 'min_views', 'max_views')
+
+    def __init__(self, tracer: Tracer, prompts=None, cap=None):
+        self.tracer = tracer
+        self.prompts = prompts
+        self.cap = cap
+        self.parents = {}
+        self.spans = {}
+
+    def _parent(self, run_id) -> Optional[Span]:
+        while run_id is not None:
+            if run_id in self.spans:
+                return self.spans[run_id]
+
+            run_id = self.parents.get(run_id)
+
+        return None
+
+    def _attributes(self, state) -> dict:
+        attributes = {key: state[key] for key in self.prices if isinstance(state, dict) and key in state}
+
+        with contextlib.suppress(TypeError, ValueError, ArithmeticError):
+            attributes['cap'] = self.cap(state)
+
+        return attributes
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            if (span := self.tracer.current.get()) is not None:
+                self.spans[run_id] = span
+            return
+
+        self.parents[run_id] = parent_run_id
+
+        if metadata and kwargs.get('name') == metadata.get('langgraph_node'):
+            self.spans[run_id] = self.tracer.start(
+                kwargs['name'],
+                self._parent(parent_run_id),
+                **self._attributes(inputs)
+            )
+
+    def _finish_chain(self, run_id, status, branch=None):
+        self.parents.pop(run_id, None)
+        span = self.spans.pop(run_id, None)
+
+        if span is None or span is self.tracer.current.get():
+            return
+
+        span.status = status
+
+        if branch is not None:
+            span.attributes['branch'] = branch
+
+        self.tracer.end(span)
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish_chain(run_id, 'ok', str(getattr(outputs, 'goto', None) or 'return'))
+
+    async def on_chain_error(self, error, *, run_id, **kwargs):
+        if isinstance(error, GraphInterrupt):
+            self._finish_chain(run_id, 'ok', 'interrupt')
+        else:
+            self._finish_chain(run_id, type(error).__name__)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        prompt = self.prompts.name(messages[-1][-1].content) if self.prompts else 'unknown'
+        self.spans[run_id] = self.tracer.start('llm', self._parent(parent_run_id), prompt=prompt)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self.spans.pop(run_id, None)
+
+        if span is not None:
+            message = getattr(response.generations[0][0], 'message', None) if response.generations else None
+            span.attributes.update(getattr(message, 'usage_metadata', None) or {})
+            self.tracer.end(span)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self.spans.pop(run_id, None)
+
+        if span is not None:
+            span.status = type(error).__name__
+            self.tracer.end(span)
+
+
+class HandlerTracingMiddleware(aiogram.BaseMiddleware):
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __call__(self, handler, event, data):
+        user = data.get('event_from_user')
+        session = self.engine.sessions.get(user.id) if user else None
+
+        with self.engine.tracer.span(
+            'handler',
+            trace_id=session.trace_id if session else None,
+            handler=data['handler'].callback.__name__,
+            user_id=user.id if user else None
+        ):
+            return await handler(event, data)
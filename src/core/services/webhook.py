@@ -0,0 +1,36 @@
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+from .workers import ChatWorkerPool
+
+
+def chat_of(update: dict):
+    for event in update.values():
+        if not isinstance(event, dict):
+            continue
+
+        chat = event.get('chat') or (event.get('message') or {}).get('chat')
+
+        if chat:
+            return chat.get('id')
+
+        if 'from' in event:
+            return event['from'].get('id')
+
+
+class PooledRequestHandler(SimpleRequestHandler):
+
+    def __init__(self, dispatcher, bot, pool: ChatWorkerPool, **kwargs):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self.pool = pool
+
+    async def _handle_request_background(self, bot, request):
+        update = await request.json(loads=bot.session.json_loads)
+
+        async def feed(update):
+            await self._background_feed_update(bot=bot, update=update)
+
+        if not self.pool.submit(chat_of(update), feed, update):
+            return web.Response(status=503, headers={'Retry-After': '1'})
+
+        return web.json_response({}, dumps=bot.session.json_dumps)
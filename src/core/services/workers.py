@@ -0,0 +1,101 @@
+import asyncio
+import collections
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def text_of(update: dict):
+    message = update.get('message')
+
+    # only plain messages merge: a command, a caption or any other event keeps its own turn
+    if set(update) == {'update_id', 'message'} and isinstance(message.get('text'), str) and not message['text'].startswith('/'):
+        return message['text']
+
+
+class ChatWorkerPool:
+
+    def __init__(self, concurrency: int, max_pending: int, coalesce: bool = True):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_pending = max_pending
+        self.coalesce = coalesce
+        self.queues = {}
+        self.tasks = set()
+        self.pending = 0
+        self.coalesced = 0
+        self.accepting = True
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    def submit(self, chat_id, feed, update: dict) -> bool:
+        if self.saturated or not self.accepting:
+            return False
+
+        self.pending += 1
+        key = chat_id if chat_id is not None else object()
+
+        if key in self.queues:
+            self.queues[key].append((feed, update))
+            return True
+
+        self.queues[key] = collections.deque([(feed, update)])
+        task = asyncio.create_task(self._drain(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        return True
+
+    def _coalesce(self, queue, update: dict) -> dict:
+        # a burst that queued up behind the chat's running update becomes one turn, not one graph resume per message
+        texts = [text_of(update)]
+
+        if not self.coalesce or texts[0] is None:
+            return update
+
+        while queue and (text := text_of(queue[0][1])) is not None and queue[0][1]['message'].get('from') == update['message'].get('from'):
+            _, update = queue.popleft()
+            texts.append(text)
+            self.pending -= 1
+            self.coalesced += 1
+
+        return {**update, 'message': {**update['message'], 'text': '\n'.join(texts)}} if len(texts) > 1 else update
+
+    async def _drain(self, key):
+        queue = self.queues[key]
+
+        try:
+            while queue:
+                feed, update = queue.popleft()
+
+                try:
+                    async with self.semaphore:
+                        await feed(self._coalesce(queue, update))
+
+                except Exception:
+                    logger.exception('Job for chat %s failed', key)
+
+                finally:
+                    self.pending -= 1
+
+        finally:
+            del self.queues[key]
+
+    async def drain(self, timeout: float) -> dict:
+        self.accepting = False
+
+        if self.tasks:
+            await asyncio.wait(self.tasks, timeout=timeout)
+
+        # the job being run was already popped from its queue
+        dropped = {key: len(queue) + 1 for key, queue in self.queues.items()}
+
+        for task in self.tasks:
+            task.cancel()
+
+        if self.tasks:
+            await asyncio.wait(self.tasks)
+
+        return dropped
@@ -2,7 +2,20 @@ import config
 import core
 
 import aiogram
+import aiogram.webhook.aiohttp_server
+import aiohttp.web
 import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+import signal
+import sys
+
+
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -19,27 +32,92 @@ class Bot():
 
 	def __init__(self, settings):
 
-		self.engine = core.services.Engine(api_key = settings.OPENAI_API_TOKEN.get_secret_value())
-		self.bot = aiogram.Bot(token = settings.TELEGRAM_TOKEN.get_secret_value())
-		self.dispatcher = aiogram.Dispatcher()
+		self.settings = settings
+		self.engine = core.services.Engine(settings = settings)
+		self.bot = aiogram.Bot(token = settings.TELEGRAM_TOKEN.get_secret_value(), session = self.session_setup(settings))
+		self.dispatcher = self.dispatcher_setup()
+		self.pool = None
+		self.campaign = None
 
 		self.handlers_setup()
 		self.commands_setup()
+		self.snapshot_restore()
+
+	@staticmethod
+	def session_setup(settings):
+
+		if settings.TELEGRAM_API_URL:
+
+			return aiogram.client.session.aiohttp.AiohttpSession(
+				api = aiogram.client.telegram.TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)
+			)
+
+	@staticmethod
+	def signals_setup():
+
+		stopping = asyncio.Event()
+
+		for signum in (signal.SIGTERM, signal.SIGINT):
+
+			asyncio.get_running_loop().add_signal_handler(signum, stopping.set)
+
+		return stopping
+
+	def dispatcher_setup(self):
+
+		match self.settings.FSM_STORAGE:
+
+			case 'sqlite':
+
+				storage = core.services.SQLiteRecordStorage(self.settings.FSM_STORAGE_PATH, pool_size = self.settings.FSM_POOL_SIZE)
+
+			case 'redis':
+
+				storage = core.services.RedisRecordStorage.from_url(self.settings.FSM_REDIS_URL, pool_size = self.settings.FSM_POOL_SIZE)
+
+			case _:
+
+				storage = core.services.MemoryRecordStorage()
+
+		return core.services.ScopedDispatcher(storage = storage)
+
+	def pool_setup(self):
+
+		self.pool = core.services.ChatWorkerPool(
+			concurrency = self.settings.WORKERS_CONCURRENCY,
+			max_pending = self.settings.WORKERS_MAX_PENDING,
+			coalesce = self.settings.WORKERS_COALESCE
+		)
 
 	def commands_setup(self):
 
+		if self.settings.SHARD:
+
+			return
+
 		async def run():
 
 			commands = [
-				aiogram.types.BotCommand(command = '/start', description = 'Input user\'s metrics'),
-				aiogram.types.BotCommand(command = '/scenario', description = 'Influencer dialogue start')
+				aiogram.types.BotCommand(command = 'start', description = 'Input user\'s metrics'),
+				aiogram.types.BotCommand(command = 'scenario', description = 'Influencer dialogue start')
 			]
-			await self.bot.set_my_commands(commands = commands)
+
+			current = await self.bot.get_my_commands()
+
+			if [command.model_dump() for command in current] != [command.model_dump() for command in commands]:
+
+				await self.bot.set_my_commands(commands = commands)
 
 		asyncio.create_task(run())
 
 	def handlers_setup(self):
 
+		self.dispatcher.message.middleware(core.services.HandlerMetricsMiddleware(self.engine.metrics))
+
+		if self.engine.tracer:
+
+			self.dispatcher.message.middleware(core.services.HandlerTracingMiddleware(self.engine))
+
 		@self.dispatcher.message(aiogram.filters.Command('start'))
 		async def handle_command_start(message: aiogram.types.Message, state: aiogram.fsm.context.FSMContext):
 
@@ -84,9 +162,297 @@ class Bot():
 
 			reflexion = await core.handlers.handle_message_text(message, state, self.engine)
 
+	def snapshot_path(self):
+
+		if self.settings.STATE_SNAPSHOT_PATH is None:
+
+			return None
+
+		return self.settings.STATE_SNAPSHOT_PATH + (f'.{self.settings.SHARD}' if self.settings.SHARD is not None else '')
+
+	def snapshot_save(self):
+
+		path = self.snapshot_path()
+		parts = {'checkpoints': self.engine.memory.store.snapshot(), 'fsm': self.dispatcher.fsm.storage.snapshot()}
+		parts = {name: part for name, part in parts.items() if part is not None}
+
+		if path is None or not parts:
+
+			return None
+
+		with open(path + '.tmp', 'w', encoding = 'utf-8') as file:
+
+			json.dump(parts, file, ensure_ascii = False)
+
+		os.replace(path + '.tmp', path)
+
+		return path
+
+	def snapshot_restore(self):
+
+		path = self.snapshot_path()
+
+		if path is None or not os.path.exists(path):
+
+			return
+
+		with open(path, encoding = 'utf-8') as file:
+
+			parts = json.load(file)
+
+		self.engine.memory.store.restore(parts.get('checkpoints', {}))
+		self.dispatcher.fsm.storage.restore(parts.get('fsm', {}))
+		os.remove(path)
+
+	async def jobs_recover(self):
+
+		journal = self.engine.jobs.journal
+
+		if journal is None:
+
+			return
+
+		for job_id, priority, update in await journal.pending():
+
+			await journal.remove(job_id)
+			update = {**update, 'update_id': job_id}
+
+			if self.pool is not None:
+
+				self.pool.submit(update['message']['chat']['id'], functools.partial(self.dispatcher.feed_raw_update, self.bot), update)
+
+			else:
+
+				asyncio.create_task(self.dispatcher.feed_raw_update(self.bot, update))
+
+			logger.warning('Replaying %s job %d left by the previous process', priority, job_id)
+
+	async def run_campaign(self):
+
+		ring = core.services.HashRing(self.settings.SHARDS)
+		shard = self.settings.SHARD
+		shards = self.settings.SHARDS if shard is not None else 1
+		progress_path = self.settings.CAMPAIGN_PROGRESS_PATH or self.settings.CAMPAIGN_PATH + '.progress.jsonl'
+
+		campaign = core.services.Campaign(
+			path = self.settings.CAMPAIGN_PATH,
+			bot = self.bot,
+			storage = self.dispatcher.fsm.storage,
+			engine = self.engine,
+			text = core.handlers.pitch,
+			progress_path = progress_path + (f'.{shard}' if shard is not None else ''),
+			rate = self.settings.CAMPAIGN_RATE / shards,
+			burst = max(1, self.settings.CAMPAIGN_BURST // shards),
+			chat_rate = self.settings.CAMPAIGN_CHAT_RATE,
+			batch = self.settings.CAMPAIGN_BATCH,
+			owned = (lambda chat_id: ring.shard(chat_id) == shard) if shard is not None else None,
+			metrics = self.engine.metrics
+		)
+
+		try:
+
+			report = await campaign.run()
+
+		except (OSError, ValueError):
+
+			logger.exception('Campaign %s failed', self.settings.CAMPAIGN_PATH)
+			return
+
+		logger.info('Campaign: %s', json.dumps(report))
+
+	async def drain(self):
+
+		if self.campaign is not None and not self.campaign.done():
+
+			self.campaign.cancel()
+
+			await asyncio.wait({self.campaign})
+
+		loop = asyncio.get_running_loop()
+		started = loop.time()
+		deadline = started + self.settings.DRAIN_TIMEOUT
+		queued = await self.pool.drain(self.settings.DRAIN_TIMEOUT) if self.pool is not None else {}
+		running = await self.dispatcher.drain(max(0.0, deadline - loop.time()))
+
+		report = {
+			'seconds': round(loop.time() - started, 3),
+			'dropped_queued': {str(chat_id): count for chat_id, count in queued.items()},
+			'dropped_running': running,
+			'journaled_jobs': len(await self.engine.jobs.journal.pending()) if self.engine.jobs.journal is not None else 0,
+			'snapshot': self.snapshot_save()
+		}
+
+		await self.engine.close()
+		await self.dispatcher.fsm.storage.close()
+		await self.bot.session.close()
+
+		logger.info('Drained: %s', json.dumps(report))
+
+		return report
+
 	async def run(self):
 
-		await self.dispatcher.start_polling(self.bot)
+		self.engine.warmup()
+		self.stopping = self.signals_setup()
+
+		if self.settings.CAMPAIGN_PATH:
+
+			self.campaign = asyncio.create_task(self.run_campaign())
+
+		if self.settings.METRICS_PORT:
+
+			await self.run_metrics()
+
+		if self.settings.SHARD is not None:
+
+			await self.run_shard()
+			return
+
+		match self.settings.MODE:
+
+			case 'webhook':
+
+				await self.run_webhook()
+
+			case _:
+
+				await self.run_polling()
+
+	async def run_polling(self):
+
+		await self.jobs_recover()
+
+		polling = asyncio.create_task(self.dispatcher.start_polling(self.bot, handle_signals = False, close_bot_session = False))
+		stopping = asyncio.create_task(self.stopping.wait())
+
+		await asyncio.wait({polling, stopping}, return_when = asyncio.FIRST_COMPLETED)
+		stopping.cancel()
+
+		if not polling.done():
+
+			await self.dispatcher.stop_polling()
+
+		await self.drain()
+		await polling
+
+	async def run_metrics(self):
+
+		async def handle_metrics(request):
+
+			return aiohttp.web.Response(text = self.engine.metrics.render(), content_type = 'text/plain', charset = 'utf-8')
+
+		application = aiohttp.web.Application()
+		application.router.add_get('/metrics', handle_metrics)
+
+		runner = aiohttp.web.AppRunner(application)
+		await runner.setup()
+		await aiohttp.web.TCPSite(runner, self.settings.METRICS_HOST, self.settings.METRICS_PORT + (self.settings.SHARD or 0)).start()
+
+	async def run_shard(self):
+
+		self.pool_setup()
+
+		server = core.services.ShardServer(
+			directory = self.settings.SHARD_SOCKET_DIR,
+			shard = self.settings.SHARD,
+			dispatcher = self.dispatcher,
+			bot = self.bot,
+			pool = self.pool
+		)
+		await server.start()
+		await self.jobs_recover()
+		parent = os.getppid()
+
+		while os.getppid() == parent and not self.stopping.is_set():
+
+			with contextlib.suppress(asyncio.TimeoutError):
+
+				await asyncio.wait_for(self.stopping.wait(), 1)
+
+		try:
+
+			await self.drain()
+
+		finally:
+
+			await server.close()
+
+	async def run_webhook(self):
+
+		secret = self.settings.WEBHOOK_SECRET.get_secret_value() if self.settings.WEBHOOK_SECRET else None
+
+		self.pool_setup()
+
+		application = aiohttp.web.Application()
+		core.services.PooledRequestHandler(
+			dispatcher = self.dispatcher,
+			bot = self.bot,
+			pool = self.pool,
+			secret_token = secret
+		).register(application, path = self.settings.WEBHOOK_PATH)
+		aiogram.webhook.aiohttp_server.setup_application(application, self.dispatcher, bot = self.bot)
+
+		runner = aiohttp.web.AppRunner(application)
+		await runner.setup()
+		await aiohttp.web.TCPSite(runner, self.settings.WEBHOOK_HOST, self.settings.WEBHOOK_PORT).start()
+
+		if self.settings.WEBHOOK_URL:
+
+			await self.bot.set_webhook(self.settings.WEBHOOK_URL + self.settings.WEBHOOK_PATH, secret_token = secret)
+
+		await self.jobs_recover()
+
+		try:
+
+			await self.stopping.wait()
+			await self.drain()
+
+		finally:
+
+			await runner.cleanup()
+
+
+
+class Front():
+
+	def __init__(self, settings):
+
+		self.settings = settings
+		self.secret = settings.WEBHOOK_SECRET.get_secret_value() if settings.WEBHOOK_SECRET else None
+		self.bot = aiogram.Bot(token = settings.TELEGRAM_TOKEN.get_secret_value(), session = Bot.session_setup(settings))
+		self.supervisor = core.services.Supervisor(
+			command = [sys.executable, os.path.abspath(__file__)],
+			shards = settings.SHARDS,
+			directory = settings.SHARD_SOCKET_DIR,
+			secret = self.secret
+		)
+
+	async def run(self):
+
+		await self.supervisor.start()
+
+		application = aiohttp.web.Application()
+		self.supervisor.register(application, path = self.settings.WEBHOOK_PATH)
+
+		runner = aiohttp.web.AppRunner(application)
+		await runner.setup()
+		await aiohttp.web.TCPSite(runner, self.settings.WEBHOOK_HOST, self.settings.WEBHOOK_PORT).start()
+
+		if self.settings.WEBHOOK_URL:
+
+			await self.bot.set_webhook(self.settings.WEBHOOK_URL + self.settings.WEBHOOK_PATH, secret_token = self.secret)
+
+		stopping = Bot.signals_setup()
+
+		try:
+
+			await stopping.wait()
+
+		finally:
+
+			await runner.cleanup()
+			await self.supervisor.stop()
+			await self.bot.session.close()
 
 
 
@@ -95,7 +461,16 @@ if __name__ == '__main__':
 	async def main():
 
 		settings = config.Settings()
-		bot = Bot(settings)
-		await bot.run()
+
+		logging.basicConfig(level = settings.LOG_LEVEL, format = '%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+		if settings.SHARDS > 1 and settings.SHARD is None:
+
+			await Front(settings).run()
+
+		else:
+
+			bot = Bot(settings)
+			await bot.run()
 
 	asyncio.run(main())
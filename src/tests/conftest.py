@@ -0,0 +1,29 @@
+import pytest
+
+import config
+from core.services.engine import Engine
+from tools.fake_llm import FakeChatModel
+
+
+STATE = {'client_cpm': '15', 'min_views': '10000', 'max_views': '50000', 'influencer_price': '0'}
+
+
+@pytest.fixture
+def make_engine():
+    def make(**overrides):
+        settings = config.Settings(**{
+            'OPENAI_API_TOKEN': 'test',
+            'TELEGRAM_TOKEN': '1:test',
+            'PROMPT_TOKENIZER': None,
+            'LLM_EVAL_LOG_PATH': None,
+            **overrides
+        })
+        engine = Engine(settings=settings)
+        model = FakeChatModel(latency=0.0, words=5)
+
+        for _, client in engine.llms.items():
+            client.model = model
+
+        return engine
+
+    return make
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from core.services import checkpointers
+from core.services.checkpointers import MemoryStore, SQLiteStore, StoreCheckpointSaver
+
+
+CONFIG = {'configurable': {'thread_id': '1', 'checkpoint_ns': ''}}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteStore(str(tmp_path / 'checkpoints.sqlite'))
+
+    return MemoryStore()
+
+
+async def put(saver, config, step):
+    checkpoint = empty_checkpoint()
+    return checkpoint, await saver.aput(config, checkpoint, {'source': 'loop', 'step': step}, {})
+
+
+def test_round_trip(store):
+    saver = StoreCheckpointSaver(store)
+
+    async def scenario():
+        first, config = await put(saver, CONFIG, 0)
+        second, config = await put(saver, config, 1)
+        await saver.aput_writes(config, [('message', 'hello'), ('price', '600')], 'task')
+
+        return first, second, await saver.aget_tuple(CONFIG), [item async for item in saver.alist(CONFIG)]
+
+    first, second, latest, listed = asyncio.run(scenario())
+
+    assert latest.checkpoint['id'] == second['id']
+    assert latest.metadata['step'] == 1
+    assert latest.parent_config['configurable']['checkpoint_id'] == first['id']
+    assert latest.pending_writes == [('task', 'message', 'hello'), ('task', 'price', '600')]
+    assert [item.checkpoint['id'] for item in listed] == [second['id'], first['id']]
+
+
+def test_concurrent_tasks_keep_their_writes(store):
+    saver = StoreCheckpointSaver(store)
+
+    async def scenario():
+        _, config = await put(saver, CONFIG, 0)
+        await asyncio.gather(*(saver.aput_writes(config, [('channel', task)], task) for task in ('a', 'b', 'c', 'd')))
+
+        return await saver.aget_tuple(config)
+
+    checkpoint = asyncio.run(scenario())
+
+    assert sorted(checkpoint.pending_writes) == [(task, 'channel', task) for task in ('a', 'b', 'c', 'd')]
+
+
+def test_regular_writes_are_not_overwritten(store):
+    saver = StoreCheckpointSaver(store)
+
+    async def scenario():
+        _, config = await put(saver, CONFIG, 0)
+        await saver.aput_writes(config, [('channel', 'first')], 'task')
+        await saver.aput_writes(config, [('channel', 'second')], 'task')
+
+        return await saver.aget_tuple(config)
+
+    assert asyncio.run(scenario()).pending_writes == [('task', 'channel', 'first')]
+
+
+def test_keeps_the_newest_checkpoints(store):
+    saver = StoreCheckpointSaver(store, keep=2)
+
+    async def scenario():
+        config, ids = CONFIG, []
+
+        for step in range(5):
+            checkpoint, config = await put(saver, config, step)
+            await saver.aput_writes(config, [('channel', step)], 'task')
+            ids.append(checkpoint['id'])
+
+        return ids, [item async for item in saver.alist(CONFIG)], await store.scan('1\x00')
+
+    ids, listed, keys = asyncio.run(scenario())
+
+    assert [item.checkpoint['id'] for item in listed] == ids[:-3:-1]
+    assert [item.pending_writes for item in listed] == [[('task', 'channel', 4)], [('task', 'channel', 3)]]
+    assert len(keys) == 4
+
+
+def test_expired_checkpoints_are_gone(store, monkeypatch):
+    saver = StoreCheckpointSaver(store, ttl=60)
+    now = checkpointers.time.time()
+
+    async def scenario():
+        _, config = await put(saver, CONFIG, 0)
+        await saver.aput_writes(config, [('channel', 'value')], 'task')
+        alive = await saver.aget_tuple(CONFIG)
+
+        monkeypatch.setattr(checkpointers.time, 'time', lambda: now + 61)
+
+        return alive, await saver.aget_tuple(CONFIG), [item async for item in saver.alist(CONFIG)]
+
+    alive, expired, listed = asyncio.run(scenario())
+
+    assert alive is not None
+    assert expired is None
+    assert listed == []
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from core.services.classifiers import KeywordClassifier, NaiveBayesClassifier, doubted
+from core.services.nodes import PriceCPMNode
+
+from .conftest import STATE
+
+
+LABELS = ('AGREEMENT', 'LOW_CAP', 'LOW_CPM', 'NO_CPM')
+
+NOT_AGREED = (
+    'Yes, but 5000 is my minimum',
+    "ok, I'll think about it",
+    'Great question, who is the brand?',
+    'да, но мне нужно 5000'
+)
+
+
+@pytest.mark.parametrize('text', NOT_AGREED)
+def test_weak_or_doubtful_agreement_is_not_confident(text):
+    label, confidence = KeywordClassifier().predict(text, LABELS)
+
+    assert doubted(label, confidence, text) < 0.9
+
+
+@pytest.mark.parametrize('text', ('Agreed, deal!', 'Yes, I agree', 'Согласен, договорились'))
+def test_unambiguous_agreement_is_confident(text):
+    assert KeywordClassifier().predict(text, LABELS) == ('AGREEMENT', 1.0)
+
+
+def test_single_keyword_is_capped():
+    _, confidence = KeywordClassifier().predict('ok', LABELS)
+
+    assert confidence <= KeywordClassifier.single_cap
+
+
+@pytest.mark.parametrize('text', NOT_AGREED)
+def test_engine_asks_the_llm(make_engine, text):
+    engine = make_engine(CLASSIFIER_THRESHOLD=0.9)
+
+    async def negotiate():
+        await engine.reset(1)
+        await engine.query({**STATE, 'message': 'my price is 5000'}, 1)
+        return await engine.query({**STATE, 'message': text}, 1)
+
+    asyncio.run(negotiate())
+
+    assert engine.classify_locally(PriceCPMNode.prompt_detect_behaviour_cpm, text) is None
+    assert engine.classifications['local'] == 0
+    assert engine.classifications['llm'] == 1
+
+
+def skewed():
+    samples = [('agreed, deal', 'AGREEMENT')] * 48 + [('cap is too small', 'LOW_CAP'), ('fixed price only', 'NO_CPM')]
+    return NaiveBayesClassifier().fit(samples)
+
+
+@pytest.mark.parametrize('text', ('zzzz qqqq', ''))
+def test_unseen_text_has_no_prediction(text):
+    assert skewed().predict(text, LABELS) == (None, 0.0)
+
+
+def test_doubt_caps_every_backend(tmp_path, make_engine):
+    path = tmp_path / 'classifier.json'
+    skewed().save(str(path))
+    engine = make_engine(CLASSIFIER_MODEL_PATH=str(path), CLASSIFIER_THRESHOLD=0.9)
+    prompt = PriceCPMNode.prompt_detect_behaviour_cpm
+
+    assert engine.classify_locally(prompt, 'agreed, deal') == 'AGREEMENT'
+    assert engine.classify_locally(prompt, 'agreed, deal?') is None
+    assert engine.classify_locally(prompt, 'zzzz qqqq') is None
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from .conftest import STATE
+
+
+def test_open_breaker_leaves_the_negotiation_in_place(make_engine):
+    engine = make_engine(CLASSIFIER_THRESHOLD=1.01)
+    config = {'configurable': {'thread_id': 1}}
+
+    async def scenario():
+        await engine.reset(1)
+        await engine.query({**STATE, 'message': 'my price is 5000'}, 1)
+        before = await engine.app.aget_state(config)
+
+        engine.llms['compose'].breaker.opened = time.monotonic()
+        failed = await engine.query({**STATE, 'message': 'LOW_CAP'}, 1)
+        during = await engine.app.aget_state(config)
+
+        engine.llms['compose'].breaker.success()
+        await engine.query({**STATE, 'message': 'LOW_CAP'}, 1)
+        after = await engine.app.aget_state(config)
+
+        return before, failed, during, after
+
+    before, failed, during, after = asyncio.run(scenario())
+
+    assert failed['message'] == engine.settings.LLM_FALLBACK_MESSAGE
+    assert before.next == ('PRICE_CPM',)
+    # the failed attempt is recorded on the pending task, which is why it drops out of next
+    assert [task.name for task in during.tasks] == ['PRICE_CPM']
+    assert during.values == before.values
+    assert after.next == ('PRICE_CPM_CAP',)
+
+
+def test_failed_first_turn_starts_over(make_engine):
+    engine = make_engine()
+    config = {'configurable': {'thread_id': 1}}
+
+    async def scenario():
+        await engine.reset(1)
+        engine.llms['compose'].breaker.opened = time.monotonic()
+        failed = await engine.query({**STATE, 'message': 'my price is 5000'}, 1)
+
+        engine.llms['compose'].breaker.success()
+        await engine.query({**STATE, 'message': 'my price is 6000'}, 1)
+
+        return failed, await engine.app.aget_state(config)
+
+    failed, snapshot = asyncio.run(scenario())
+
+    assert failed['message'] == engine.settings.LLM_FALLBACK_MESSAGE
+    assert snapshot.next == ('PRICE_CPM',)
+
+
+def test_routes_share_the_account_rate(make_engine):
+    engine = make_engine(LLM_RATE=0.001, LLM_BURST=2, LLM_ROUTES={'compose': 'gpt-4o-mini'})
+
+    async def scenario():
+        await engine.llms['extract'].ainvoke('first')
+        await engine.llms['compose'].ainvoke('second')
+
+    asyncio.run(scenario())
+
+    assert len({id(client.bucket) for _, client in engine.llms.items()}) == 1
+    assert engine.llms['classify'].bucket.tokens < 1
@@ -0,0 +1,60 @@
+import asyncio
+
+import aiogram
+
+import config
+from core.services.debounce import Debouncer
+from core.services.workers import ChatWorkerPool
+from main import Bot
+from tools.replay import StubSession
+
+
+def test_rapid_messages_are_merged():
+    debouncer = Debouncer(0.05)
+
+    async def scenario():
+        return await asyncio.gather(debouncer.collect(1, 'first'), debouncer.collect(1, 'second'))
+
+    assert asyncio.run(scenario()) == ['first\nsecond', None]
+
+
+def update(update_id, text, user_id=7, **extra):
+    return {
+        'update_id': update_id,
+        'message': {'message_id': update_id, 'date': 0, 'chat': {'id': 7, 'type': 'private'}, 'from': {'id': user_id}, 'text': text, **extra}
+    }
+
+
+def test_pool_merges_a_queued_burst():
+    pool = ChatWorkerPool(concurrency=4, max_pending=100)
+    fed = []
+
+    async def feed(update):
+        fed.append(update['message']['text'])
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        for update_id, text in enumerate(['my price is 5000', 'or 4500', 'final offer', '/start', 'hello', 'there']):
+            pool.submit(7, feed, update(update_id, text))
+
+        pool.submit(7, feed, update(6, 'from someone else', user_id=8))
+        await asyncio.gather(*pool.tasks)
+
+    asyncio.run(scenario())
+
+    assert fed == ['my price is 5000\nor 4500\nfinal offer', '/start', 'hello\nthere', 'from someone else']
+    assert pool.coalesced == 3
+    assert pool.pending == 0
+
+
+def test_pool_mode_keeps_the_debounce_window():
+    settings = config.Settings(OPENAI_API_TOKEN='test', TELEGRAM_TOKEN='1:test', PROMPT_TOKENIZER=None, DEBOUNCE_WINDOW=0.3)
+
+    async def scenario():
+        bot = Bot(settings)
+        bot.bot = aiogram.Bot(token='1:test', session=StubSession())
+        bot.pool_setup()
+
+        return bot.engine.debouncer.window
+
+    assert asyncio.run(scenario()) == 0.3
@@ -0,0 +1,44 @@
+import pytest
+
+from core.services.extractors import Extractor
+
+
+@pytest.mark.parametrize('text', [
+    'March 20 works',
+    '20 March works',
+    'the 20th of March',
+    'Friday 5',
+    'at 10:10',
+    '5 pm',
+    "5 o'clock",
+    'in 2 weeks',
+    '20.03.2025',
+    '2025-03-20',
+    '20 марта',
+    '20-го числа'
+])
+def test_dates_and_times_are_left_to_the_llm(text):
+    extractor = Extractor()
+
+    assert extractor.number(text) is None
+    assert extractor.fallbacks['number'] == 1
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('5000', 5000),
+    ('$5000', 5000),
+    ('my price is 5k', 5000),
+    ('5000 rub', 5000),
+    ('5000 per video', 5000),
+    ('1,500', 1500),
+    ('10.5k', 10500)
+])
+def test_amounts_are_extracted(text, expected):
+    assert Extractor().number(text) == expected
+
+
+def test_date_range_is_left_to_the_llm():
+    extractor = Extractor()
+
+    assert extractor.range('from March 5 to March 10') is None
+    assert extractor.range('10k-20k') == (10000, 20000)
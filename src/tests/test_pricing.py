@@ -0,0 +1,79 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from core.services.pricing import Ladder, PricingPolicy, number
+
+from .conftest import STATE
+
+
+def test_ladder_is_exact():
+    ladder = PricingPolicy().ladder('15', '10000', '50000')
+
+    assert ladder.budget == Decimal(150)
+    assert ladder.cap == Decimal(600)
+    assert ladder.raised_cap == Decimal(780)
+    assert ladder.raised_cpm == Decimal('17.25')
+    assert ladder.raised_cpm_cap == Decimal(690)
+    assert ladder.fixes == (Decimal(600), Decimal(720), Decimal(780))
+
+
+def test_raised_cpm_feeds_the_next_ladder():
+    policy = PricingPolicy()
+    raised = policy.ladder(str(policy.ladder('15', '10000', '50000').raised_cpm), '10000', '50000')
+
+    assert raised.cpm == Decimal('17.25')
+    assert raised.fixes == (Decimal(690), Decimal(828), Decimal(897))
+
+
+@pytest.mark.parametrize('value, expected', [('17.250', '17.25'), ('20.00', '20'), ('0.10', '0.1')])
+def test_rates_are_printed_plainly(value, expected):
+    assert str(PricingPolicy.plain(Decimal(value))) == expected
+
+
+def test_cap_rounds_down_and_amounts_round_half_up():
+    ladder = PricingPolicy().ladder('1', '1', '1')
+
+    assert ladder.cap == Decimal(0)
+    assert PricingPolicy().amount(Decimal('2.5')) == Decimal(3)
+
+
+def test_policy_coerces_its_fields():
+    policy = PricingPolicy(cap_raise='1.5', fix_raises=['1', '2'])
+
+    assert policy.cap_raise == Decimal('1.5')
+    assert policy.fix_raises == (Decimal(1), Decimal(2))
+
+
+def test_budget_acceptance():
+    ladder = PricingPolicy().ladder(number('15'), 10000, 50000)
+
+    assert isinstance(ladder, Ladder)
+    assert ladder.accepts('150')
+    assert not ladder.accepts(' 150.01 ')
+
+
+def test_low_cpm_after_the_raise_offers_a_fixed_price(make_engine):
+    engine = make_engine(CLASSIFIER_THRESHOLD=1.01)
+    config = {'configurable': {'thread_id': 1}}
+
+    async def negotiate():
+        await engine.reset(1)
+        replies = []
+
+        for text in ('my price is 5000', 'LOW_CPM', 'please LOW_CPM', 'LOW_FIX_PRICE', 'AGREEMENT'):
+            replies.append(await engine.query({**STATE, 'message': text}, 1))
+
+            if text == 'please LOW_CPM':
+                fixing = await engine.app.aget_state(config)
+
+        return replies, fixing
+
+    replies, fixing = asyncio.run(negotiate())
+
+    assert fixing.next == ('PRICE_FIX',)
+    assert replies[2]['influencer_price'] == '690'
+    assert replies[2]['message'] != 'please LOW_CPM'
+    assert replies[-1]['influencer_price'] == '828'
+    assert replies[-1]['success']
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import tiktoken
+
+from .conftest import STATE
+
+
+class FakeEncoding:
+
+    def encode(self, text):
+        return text.split()
+
+
+def test_tokenizer_loads_off_the_event_loop(make_engine, monkeypatch):
+    encoding, threads = FakeEncoding(), []
+
+    def get_encoding(name):
+        threads.append(threading.current_thread())
+        return encoding
+
+    monkeypatch.setattr(tiktoken, 'get_encoding', get_encoding)
+    engine = make_engine(PROMPT_TOKENIZER='cl100k_base')
+
+    async def scenario():
+        await engine.reset(1)
+        await engine.query({**STATE, 'message': 'hello there'}, 1)
+        loaded_before_warmup = engine.prompts.encoding
+        await engine.warmup()
+
+        return loaded_before_warmup
+
+    assert asyncio.run(scenario()) is None
+    assert engine.prompts.encoding is encoding
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_unavailable_tokenizer_counts_approximately(make_engine, monkeypatch):
+    def get_encoding(name):
+        raise ConnectionError('offline')
+
+    monkeypatch.setattr(tiktoken, 'get_encoding', get_encoding)
+    engine = make_engine(PROMPT_TOKENIZER='cl100k_base')
+
+    assert engine.prompts.load() is None
+    assert engine.prompts.count('three small words') == 3
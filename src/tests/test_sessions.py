@@ -0,0 +1,69 @@
+import asyncio
+
+from core.services.sessions import SessionRegistry
+from core.services.speculation import Draft
+
+from .conftest import STATE
+
+
+def test_rebuilt_session_keeps_the_thread_id(make_engine):
+    engine = make_engine()
+
+    async def scenario():
+        await engine.reset(1)
+        await engine.query({**STATE, 'message': 'my price is 5000'}, 1)
+        engine.sessions.pop(1)
+
+        _, config = await engine.prepare({**STATE, 'message': 'LOW_CAP'}, 1)
+
+        return config
+
+    config = asyncio.run(scenario())
+
+    assert config['configurable']['thread_id'] == 1
+    assert engine.sessions.get(1).interrupted
+
+
+def test_speculation_survives_a_rebuilt_session(make_engine):
+    engine = make_engine(SPECULATIVE_NODES=['PRICE_CPM'], CLASSIFIER_THRESHOLD=1.01)
+
+    async def scenario():
+        await engine.reset(1)
+        await engine.query({**STATE, 'message': 'my price is 5000'}, 1)
+        engine.sessions.pop(1)
+
+        return await engine.query({**STATE, 'message': 'LOW_CAP'}, 1)
+
+    asyncio.run(scenario())
+    results = {dict(labels)['result']: value for (name, labels), value in engine.metrics.counters.items() if name == 'speculation_total'}
+
+    assert results == {'hit': 1}
+    assert engine.sessions.get(1).ladder is not None
+
+
+def test_registry_key_is_normalized():
+    registry = SessionRegistry(maxsize=10, ttl=60)
+    session = registry.create(1)
+
+    assert registry.get('1') is session
+    assert registry.pop('1') is session
+    assert len(registry) == 0
+
+
+def test_evicted_session_cancels_its_drafts():
+    registry = SessionRegistry(maxsize=1, ttl=60)
+
+    async def scenario():
+        session = registry.create(1)
+        task = asyncio.create_task(asyncio.sleep(60))
+        session.drafts['LOW_CAP'] = Draft(task, expires=0.0)
+        registry.create(2)
+        await asyncio.sleep(0)
+
+        return session, task
+
+    session, task = asyncio.run(scenario())
+
+    assert task.cancelled()
+    assert session.drafts == {}
+    assert registry.get(1) is None
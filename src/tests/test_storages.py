@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from core.services.storages import MemoryRecordStorage, RedisRecordStorage, SQLiteRecordStorage
+
+
+KEY = StorageKey(bot_id=1, chat_id=7, user_id=7)
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def storage(request, tmp_path):
+    if request.param == 'redis':
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+
+        return RedisRecordStorage(fakeredis.FakeAsyncRedis())
+
+    if request.param == 'sqlite':
+        return SQLiteRecordStorage(str(tmp_path / 'fsm.sqlite'), pool_size=2)
+
+    return MemoryRecordStorage()
+
+
+def test_slow_update_keeps_concurrent_writes(storage):
+    async def scenario():
+        reading, replying = asyncio.Event(), asyncio.Event()
+
+        async def slow_reply():
+            async with storage.batch():
+                await storage.get_state(KEY)
+                await storage.get_data(KEY)
+                reading.set()
+                await replying.wait()
+                await storage.update_data(KEY, {'message': 'reply'})
+
+        async def start():
+            await reading.wait()
+            await storage.set_state(KEY, 'UserState:client_cpm')
+            await storage.update_data(KEY, {'client_cpm': '15'})
+            replying.set()
+
+        await asyncio.gather(slow_reply(), start())
+
+        return await storage.get_state(KEY), await storage.get_data(KEY)
+
+    state, data = asyncio.run(scenario())
+
+    assert state == 'UserState:client_cpm'
+    assert data == {'client_cpm': '15', 'message': 'reply'}
+
+
+def test_reads_are_cached_within_an_update(storage):
+    async def scenario():
+        await storage.set_data(KEY, {'client_cpm': '15'})
+        reads = storage.counters['reads']
+
+        async with storage.batch():
+            for _ in range(3):
+                await storage.get_state(KEY)
+                await storage.get_data(KEY)
+
+        return storage.counters['reads'] - reads
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_empty_record_is_removed(storage):
+    async def scenario():
+        await storage.set_state(KEY, 'UserState:views')
+        await storage.set_data(KEY, {'client_cpm': '15'})
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+
+        return await storage.read(storage.key_builder.build(KEY))
+
+    assert asyncio.run(scenario()) == (None, {})
+
+
+def test_concurrent_updates_keep_every_field(storage):
+    async def scenario():
+        await asyncio.gather(*(storage.update_data(KEY, {f'field_{index}': str(index)}) for index in range(20)))
+
+        return await storage.get_data(KEY)
+
+    assert asyncio.run(scenario()) == {f'field_{index}': str(index) for index in range(20)}
+
+
+def test_update_is_one_storage_operation(storage):
+    async def scenario():
+        await storage.set_state(KEY, 'UserState:views')
+        await storage.update_data(KEY, {'client_cpm': '15'})
+        counters = dict(storage.counters)
+
+        async with storage.batch():
+            data = await storage.update_data(KEY, {'message': 'hello', 'client_cpm': None})
+            state = await storage.get_state(KEY)
+            cached = await storage.get_data(KEY)
+
+        operations = sum(storage.counters.values()) - sum(counters.values())
+
+        return data, state, cached, operations
+
+    data, state, cached, operations = asyncio.run(scenario())
+
+    assert data == cached == {'message': 'hello'}
+    assert state == 'UserState:views'
+    assert operations == 1
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import itertools
+import json
+import resource
+import time
+
+import config
+import core
+
+from .fake_llm import FakeChatModel
+
+
+PATHS = {
+    'instant': ['my price is 100'],
+    'cpm_15': ['my price is 5000', 'LOW_CPM', 'AGREEMENT'],
+    'cpm_15_fix': ['my price is 5000', 'LOW_CPM', 'LOW_CPM', 'LOW_FIX_PRICE', 'AGREEMENT'],
+    'cap': ['my price is 5000', 'LOW_CAP', 'LOW_CAP', 'AGREEMENT'],
+    'fix': ['my price is 5000', 'NO_CPM', 'LOW_FIX_PRICE', 'LOW_FIX_PRICE', 'AGREEMENT'],
+    'failed': ['my price is 5000', 'NO_CPM', 'LOW_FIX_PRICE', 'LOW_FIX_PRICE', 'LOW_FIX_PRICE'],
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def build_engine(arguments, **overrides):
+    settings = config.Settings(
+        OPENAI_API_TOKEN='benchmark',
+        TELEGRAM_TOKEN='benchmark',
+        CLASSIFIER_THRESHOLD=arguments.threshold,
+        COMBINED_NODES=arguments.combined,
+        SPECULATIVE_NODES=arguments.speculative,
+        CACHE_SIZE=arguments.cache,
+        LLM_CONCURRENCY=arguments.llm_concurrency,
+        **overrides
+    )
+    engine = core.services.Engine(settings=settings)
+    model = FakeChatModel(latency=arguments.latency, jitter=arguments.jitter, words=arguments.words)
+
+    for _, client in engine.llms.items():
+        client.model = model
+
+    return engine
+
+
+async def negotiate(engine, user_id, path, latencies, failures, think=0.0):
+    state = {'client_cpm': '15', 'min_views': '10000', 'max_views': '50000', 'influencer_price': '0'}
+    await engine.reset(user_id)
+
+    for message in path:
+        await asyncio.sleep(think)
+        started = time.perf_counter()
+
+        try:
+            await engine.query({**state, 'message': message}, user_id)
+            latencies.append(time.perf_counter() - started)
+
+        except Exception as exception:
+            failures.append(repr(exception))
+            return
+
+
+async def run(arguments):
+    engine = build_engine(arguments)
+    paths = itertools.cycle([PATHS[name] for name in arguments.paths])
+    semaphore = asyncio.Semaphore(arguments.concurrency)
+    latencies, failures = [], []
+
+    async def influencer(user_id, path):
+        async with semaphore:
+            await negotiate(engine, user_id, path, latencies, failures, arguments.think)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(influencer(user_id, next(paths)) for user_id in range(arguments.influencers)))
+    elapsed = time.perf_counter() - started
+
+    calls = engine.llms['compose'].model.counters
+
+    return {
+        'influencers': arguments.influencers,
+        'turns': len(latencies),
+        'failures': len(failures),
+        'elapsed': round(elapsed, 3),
+        'turns_per_second': round(len(latencies) / elapsed, 2),
+        'latency': {
+            'p50': round(percentile(latencies, 0.50), 4),
+            'p95': round(percentile(latencies, 0.95), 4),
+            'p99': round(percentile(latencies, 0.99), 4)
+        },
+        'llm_calls': dict(calls),
+        'llm_calls_per_negotiation': round(sum(calls.values()) / arguments.influencers, 2),
+        'classifications': dict(engine.classifications),
+        'extractor': engine.extractor.stats(),
+        'speculation': {dict(labels)['result']: value for (name, labels), value in engine.metrics.counters.items() if name == 'speculation_total'},
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the negotiation graph end to end with a fake chat model.')
+    parser.add_argument('--influencers', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=100, help='influencers negotiating at the same time')
+    parser.add_argument('--paths', type=lambda value: value.split(','), default=list(PATHS), help=f'comma separated: {",".join(PATHS)}')
+    parser.add_argument('--latency', type=float, default=0.5, help='median fake LLM latency, seconds')
+    parser.add_argument('--jitter', type=float, default=0.3, help='lognormal sigma of the fake LLM latency')
+    parser.add_argument('--words', type=int, default=60, help='words per composed message')
+    parser.add_argument('--llm-concurrency', type=int, default=16)
+    parser.add_argument('--threshold', type=float, default=1.01, help='CLASSIFIER_THRESHOLD; above 1 always asks the LLM')
+    parser.add_argument('--combined', type=lambda value: value.split(','), default=[], help='COMBINED_NODES')
+    parser.add_argument('--speculative', type=lambda value: value.split(','), default=[], help='SPECULATIVE_NODES')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds the influencer takes to reply')
+    parser.add_argument('--cache', type=int, default=0, help='CACHE_SIZE')
+    arguments = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(arguments)), indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+import collections
+import json
+import random
+import re
+import time
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+pattern_label = re.compile(r"^- ([A-Z_]+):", re.MULTILINE)
+pattern_message = re.compile(r"Message: (.*?)\n\n", re.DOTALL)
+pattern_number = re.compile(r"\d+")
+
+
+class FakeChatModel(BaseChatModel):
+    model_name: str = 'fake'
+    latency: float = 0.5
+    jitter: float = 0.0
+    words: int = 60
+    chunk_words: int = 3
+    seed: int = 0
+    counters: Any = None
+
+    def model_post_init(self, context):
+        self.counters = collections.Counter()
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self):
+        return 'fake'
+
+    def delay(self) -> float:
+        return max(0.0, self._random.lognormvariate(0, self.jitter) * self.latency if self.jitter else self.latency)
+
+    def respond(self, prompt: str) -> tuple:
+        labels = pattern_label.findall(prompt)
+        message = pattern_message.search(prompt)
+        message = message.group(1) if message else ''
+
+        if prompt.startswith('Complete two steps'):
+            self.counters['combined'] += 1
+            label = next((label for label in labels if label in message), 'AGREEMENT')
+            return 'combined', json.dumps({'label': label, 'message': self.compose()})
+
+        if labels:
+            self.counters['classify'] += 1
+            return 'classify', next((label for label in labels if label in message), 'AGREEMENT')
+
+        if prompt.startswith('Analyze the following message and extract'):
+            self.counters['extract'] += 1
+            numbers = pattern_number.findall(message)
+            return 'extract', ' '.join(numbers[:2]) if 'views' in prompt else (numbers[0] if numbers else '0')
+
+        self.counters['compose'] += 1
+        return 'compose', self.compose()
+
+    def compose(self) -> str:
+        return ' '.join(self._random.choice(('offer', 'value', 'collaboration', 'cap', 'price', 'partnership')) for _ in range(self.words))
+
+    def _result(self, prompt, text):
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                'input_tokens': len(prompt.split()),
+                'output_tokens': len(text.split()),
+                'total_tokens': len(prompt.split()) + len(text.split())
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay())
+        return self._result(messages[-1].content, self.respond(messages[-1].content)[1])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay())
+        return self._result(messages[-1].content, self.respond(messages[-1].content)[1])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        delay = self.delay()
+        kind, text = self.respond(messages[-1].content)
+        words = text.split(' ')
+        chunks = [' '.join(words[index:index + self.chunk_words]) + ' ' for index in range(0, len(words), self.chunk_words)]
+
+        await asyncio.sleep(delay / 2 if kind == 'compose' else delay)
+
+        for chunk in chunks:
+            if kind == 'compose':
+                await asyncio.sleep(delay / 2 / len(chunks))
+
+            generation = ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk, chunk=generation)
+
+            yield generation
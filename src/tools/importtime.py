@@ -0,0 +1,76 @@
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def profile(modules: list) -> list:
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', f'import {", ".join(modules)}'],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+        capture_output=True,
+        text=True
+    )
+    rows = []
+
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        own, cumulative, name = line.removeprefix('import time:').split('|')
+        rows.append({'module': name.strip(), 'self': int(own) / 1e6, 'cumulative': int(cumulative) / 1e6})
+
+    if completed.returncode:
+        raise SystemExit(completed.stderr.strip().splitlines()[-1])
+
+    return rows
+
+
+def engine() -> dict:
+    import config
+    from core.services.engine import Engine
+
+    settings = config.Settings(OPENAI_API_TOKEN='importtime', TELEGRAM_TOKEN='importtime')
+    started = time.perf_counter()
+    instance = Engine(settings=settings)
+    built = time.perf_counter()
+    instance.warm()
+
+    return {'construct': round(built - started, 3), 'warm': round(time.perf_counter() - built, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report where the bot spends its cold start importing modules.')
+    parser.add_argument('modules', nargs='*', default=['main', 'core.services.engine'], help='modules the bot imports before serving, relative to src')
+    parser.add_argument('--top', type=int, default=15, help='rows per table')
+    parser.add_argument('--engine', action='store_true', help='also time Engine construction and model warm-up')
+    arguments = parser.parse_args()
+
+    rows = profile(arguments.modules)
+    packages = collections.Counter()
+
+    for row in rows:
+        packages[row['module'].split('.')[0]] += row['self']
+
+    report = {
+        'modules': arguments.modules,
+        'total': round(sum(row['self'] for row in rows), 3),
+        'packages': {name: round(seconds, 3) for name, seconds in packages.most_common(arguments.top)},
+        'slowest': {
+            row['module']: round(row['cumulative'], 3)
+            for row in sorted(rows, key=lambda row: row['cumulative'], reverse=True)[:arguments.top]
+        }
+    }
+
+    if arguments.engine:
+        report['engine'] = engine()
+
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == '__main__':
+    main()
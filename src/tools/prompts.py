@@ -0,0 +1,40 @@
+import argparse
+import json
+
+import config
+import core
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the token footprint of every registered prompt.')
+    parser.add_argument('--message', help='file with a sample influencer message to size each prompt against')
+    parser.add_argument('--budget', type=int, default=512, help='PROMPT_MESSAGE_BUDGET')
+    parser.add_argument('--tokenizer', default='cl100k_base', help='PROMPT_TOKENIZER; empty for the approximate counter')
+    arguments = parser.parse_args()
+
+    settings = config.Settings(
+        OPENAI_API_TOKEN='prompts',
+        TELEGRAM_TOKEN='prompts',
+        PROMPT_MESSAGE_BUDGET=arguments.budget,
+        PROMPT_TOKENIZER=arguments.tokenizer or None
+    )
+    prompts = core.services.Engine(settings=settings).prompts
+    prompts.load()
+    rows = prompts.report()
+
+    if arguments.message:
+        with open(arguments.message, encoding='utf-8') as file:
+            message = file.read()
+
+        print(f'message: {prompts.count(message)} tokens, {prompts.count(prompts.truncate(message))} after budgeting')
+
+        for row in rows:
+            if 'text' in row['variables']:
+                template = prompts.templates[row['prompt']]
+                row['with_message'] = prompts.count(template.format(**{**dict.fromkeys(row['variables'], '0'), 'text': prompts.truncate(message)}))
+
+    print(json.dumps(rows, indent=4))
+
+
+if __name__ == '__main__':
+    main()
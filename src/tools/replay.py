@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import time
+
+import aiogram
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.base import StorageKey
+
+import config
+from main import Bot
+
+from .benchmark import PATHS, percentile
+from .fake_llm import FakeChatModel
+
+
+class StubSession(BaseSession):
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.counters = collections.Counter()
+        self.ids = itertools.count(1)
+
+    async def close(self):
+        pass
+
+    async def make_request(self, bot, method, timeout=None):
+        self.counters[type(method).__name__] += 1
+        await asyncio.sleep(self.latency)
+
+        if isinstance(method, (aiogram.methods.SendMessage, aiogram.methods.EditMessageText)):
+            return aiogram.types.Message.model_validate(
+                {
+                    'message_id': getattr(method, 'message_id', None) or next(self.ids),
+                    'date': int(time.time()),
+                    'chat': {'id': method.chat_id, 'type': 'private'},
+                    'text': method.text
+                },
+                context={'bot': bot}
+            )
+
+        if isinstance(method, aiogram.methods.GetMe):
+            return aiogram.types.User(id=1, is_bot=True, first_name='replay', username='replay_bot')
+
+        if isinstance(method, aiogram.methods.GetMyCommands):
+            return []
+
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+
+def generate(users: int, paths: list):
+    paths = itertools.cycle([PATHS[name] for name in paths])
+
+    for user_id in range(1, users + 1):
+        texts = ['/start', '15', '10k-50k', '/scenario', *next(paths)]
+        yield user_id, [
+            {
+                'update_id': user_id * 100 + index,
+                'message': {
+                    'message_id': index + 1,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': {'id': user_id, 'is_bot': False, 'first_name': f'influencer {user_id}'},
+                    'text': text
+                }
+            }
+            for index, text in enumerate(texts)
+        ]
+
+
+def load(path: str):
+    streams = collections.defaultdict(list)
+
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                update = json.loads(line)
+                event = next(value for value in update.values() if isinstance(value, dict))
+                streams[event.get('chat', event.get('from'))['id']].append(update)
+
+    return list(streams.items())
+
+
+def build_bot(arguments):
+    settings = config.Settings(
+        OPENAI_API_TOKEN='replay',
+        TELEGRAM_TOKEN='1:replay',
+        CLASSIFIER_THRESHOLD=arguments.threshold,
+        DEBOUNCE_WINDOW=0.0
+    )
+    bot = Bot(settings)
+    bot.bot = aiogram.Bot(token=settings.TELEGRAM_TOKEN.get_secret_value(), session=StubSession(arguments.telegram_latency))
+    model = FakeChatModel(latency=arguments.latency, jitter=arguments.jitter)
+
+    for _, client in bot.engine.llms.items():
+        client.model = model
+
+    return bot
+
+
+async def label(bot, update):
+    text = (update.message.text or '') if update.message else ''
+
+    if text.startswith('/'):
+        return text.split()[0]
+
+    storage = bot.dispatcher.fsm.storage
+    key = StorageKey(bot.bot.id, update.message.chat.id, update.message.from_user.id)
+    state, _ = await storage.read(storage.key_builder.build(key))
+
+    return state or 'negotiation'
+
+
+async def replay(bot, streams, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = collections.defaultdict(list)
+
+    async def user(updates):
+        async with semaphore:
+            for raw in updates:
+                update = aiogram.types.Update.model_validate(raw, context={'bot': bot.bot})
+                name = await label(bot, update)
+                started = time.perf_counter()
+                await bot.dispatcher.feed_update(bot.bot, update)
+                latencies[name].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(updates) for _, updates in streams))
+
+    return latencies, time.perf_counter() - started
+
+
+async def run(arguments):
+    streams = load(arguments.input) if arguments.input else list(generate(arguments.users, arguments.paths))
+    updates = sum(len(stream) for _, stream in streams)
+    levels, best = [], None
+
+    for concurrency in arguments.concurrency:
+        bot = build_bot(arguments)
+        latencies, elapsed = await replay(bot, streams, concurrency)
+        every = [latency for values in latencies.values() for latency in values]
+        storage = bot.dispatcher.fsm.storage.counters
+
+        level = {
+            'concurrency': concurrency,
+            'updates': updates,
+            'updates_per_second': round(updates / elapsed, 2),
+            'p95': round(percentile(every, 0.95), 4),
+            'handlers': {
+                name: {
+                    'count': len(values),
+                    'p50': round(percentile(values, 0.50), 4),
+                    'p95': round(percentile(values, 0.95), 4)
+                }
+                for name, values in sorted(latencies.items())
+            },
+            'storage_ops_per_update': round(sum(storage.values()) / updates, 2),
+            'storage_ops': dict(storage),
+            'telegram_calls': dict(bot.bot.session.counters)
+        }
+        levels.append(level)
+
+        if level['p95'] <= arguments.slo and (best is None or level['updates_per_second'] > best['updates_per_second']):
+            best = level
+
+    return {
+        'levels': levels,
+        'max_sustainable_updates_per_second': best['updates_per_second'] if best else None,
+        'at_concurrency': best['concurrency'] if best else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay Telegram updates through Bot.dispatcher with no network.')
+    parser.add_argument('--input', help='JSONL file of raw Telegram updates; generated when omitted')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--paths', type=lambda value: value.split(','), default=list(PATHS))
+    parser.add_argument('--concurrency', type=lambda value: [int(level) for level in value.split(',')], default=[10, 50, 100])
+    parser.add_argument('--slo', type=float, default=2.0, help='p95 handler latency budget, seconds')
+    parser.add_argument('--latency', type=float, default=0.5, help='median fake LLM latency, seconds')
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--telegram-latency', type=float, default=0.0, help='simulated Bot API round trip, seconds')
+    parser.add_argument('--threshold', type=float, default=1.01, help='CLASSIFIER_THRESHOLD; above 1 always asks the LLM')
+    arguments = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(arguments)), indent=4))
+
+
+if __name__ == '__main__':
+    main()
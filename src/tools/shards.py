@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from core.services.sharding import HashRing
+
+from .benchmark import PATHS
+from .fake_llm import FakeChatModel
+from .replay import generate
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeAPI:
+
+    def __init__(self, latency: float):
+        self.model = FakeChatModel(latency=latency)
+        self.replies = collections.defaultdict(list)
+        self.calls = collections.Counter()
+        self.ids = itertools.count(1)
+        self.last = time.perf_counter()
+
+    def application(self) -> web.Application:
+        application = web.Application()
+        application.router.add_post('/bot{token}/{method}', self.telegram)
+        application.router.add_post('/v1/chat/completions', self.completions)
+        return application
+
+    async def telegram(self, request):
+        method = request.match_info['method']
+        data = await request.post()
+        self.calls[method] += 1
+        result = True
+
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'shards', 'username': 'shards_bot'}
+
+        elif method == 'getMyCommands':
+            result = []
+
+        elif method in ('sendMessage', 'editMessageText'):
+            chat_id = int(data['chat_id'])
+            self.replies[chat_id].append(data['text'])
+            self.last = time.perf_counter()
+            result = {
+                'message_id': int(data.get('message_id') or next(self.ids)),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': data['text']
+            }
+
+        return web.json_response({'ok': True, 'result': result})
+
+    async def completions(self, request):
+        body = await request.json()
+        self.calls['chat.completions'] += 1
+        prompt = body['messages'][-1]['content']
+        await asyncio.sleep(self.model.delay())
+        _, text = self.model.respond(prompt)
+
+        return web.json_response({
+            'id': f'fake-{next(self.ids)}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt.split()), 'completion_tokens': len(text.split()), 'total_tokens': len(prompt.split()) + len(text.split())}
+        })
+
+
+async def post(session, url, streams, concurrency, counters, stopped):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def user(updates):
+        async with semaphore:
+            for index, update in enumerate(updates):
+                while True:
+                    if stopped.is_set():
+                        counters['undelivered'] += len(updates) - index
+                        return
+
+                    try:
+                        async with session.post(url, json=update) as response:
+                            if response.status == 200:
+                                break
+
+                            counters[response.status] += 1
+
+                    except aiohttp.ClientConnectionError:
+                        counters['unreachable'] += 1
+
+                    await asyncio.sleep(0.2)
+
+    await asyncio.gather(*(user(updates) for _, updates in streams))
+
+
+async def run(arguments):
+    api = FakeAPI(arguments.latency)
+    runner = web.AppRunner(api.application())
+    await runner.setup()
+    api_port, front_port = free_port(), free_port()
+    await web.TCPSite(runner, '127.0.0.1', api_port).start()
+
+    directory = tempfile.mkdtemp(prefix='shards-')
+    front = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py'),
+        env={
+            **os.environ,
+            'TELEGRAM_TOKEN': '1:shards',
+            'OPENAI_API_TOKEN': 'shards',
+            'TELEGRAM_API_URL': f'http://127.0.0.1:{api_port}',
+            'OPENAI_BASE_URL': f'http://127.0.0.1:{api_port}/v1',
+            'MODE': 'webhook',
+            'WEBHOOK_HOST': '127.0.0.1',
+            'WEBHOOK_PORT': str(front_port),
+            'SHARDS': str(arguments.shards),
+            'SHARD_SOCKET_DIR': directory,
+            'CLASSIFIER_THRESHOLD': str(arguments.threshold),
+            'PROMPT_TOKENIZER': '',
+            'DRAIN_TIMEOUT': str(arguments.drain_timeout),
+            # every scripted message is its own negotiation turn, posted back to back
+            'WORKERS_COALESCE': '0',
+            'DEBOUNCE_WINDOW': '0',
+            'PYTHONWARNINGS': 'ignore'
+        },
+        stderr=asyncio.subprocess.PIPE
+    )
+    drains = []
+
+    async def collect():
+        async for line in front.stderr:
+            line = line.decode()
+
+            if 'Drained: ' in line:
+                drains.append(json.loads(line.partition('Drained: ')[2]))
+
+            # per-update access and handler lines would bury the warnings
+            elif ' INFO ' not in line:
+                sys.stderr.write(line)
+
+    collecting = asyncio.create_task(collect())
+    stopped = asyncio.Event()
+
+    async def stop(delay):
+        await asyncio.sleep(delay)
+        stopped.set()
+        front.send_signal(signal.SIGTERM)
+
+    streams = list(generate(arguments.users, arguments.paths))
+    ring = HashRing(arguments.shards)
+    counters = collections.Counter()
+    stopping = None
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            launched = time.perf_counter()
+
+            while True:
+                try:
+                    async with session.get(f'http://127.0.0.1:{front_port}/'):
+                        break
+
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.1)
+
+            started = time.perf_counter()
+
+            if arguments.stop_after is not None:
+                stopping = asyncio.create_task(stop(arguments.stop_after))
+
+            await post(session, f'http://127.0.0.1:{front_port}/webhook', streams, arguments.concurrency, counters, stopped)
+            posted = time.perf_counter()
+
+            while time.perf_counter() - api.last < arguments.settle and front.returncode is None:
+                await asyncio.sleep(0.1)
+
+    finally:
+        if stopping is not None:
+            stopping.cancel()
+
+        if front.returncode is None and not stopped.is_set():
+            front.send_signal(signal.SIGTERM)
+
+        await front.wait()
+        await collecting
+        await runner.cleanup()
+
+    replies = [api.replies[user_id] for user_id, _ in streams]
+    prefixes = collections.Counter(tuple(chat[:3]) for chat in replies)
+
+    return {
+        'shards': arguments.shards,
+        'users': len(streams),
+        'updates': sum(len(updates) for _, updates in streams),
+        'boot_seconds': round(started - launched, 3),
+        'post_seconds': round(posted - started, 3),
+        'last_reply_seconds': round(api.last - started, 3),
+        'updates_per_second': round(sum(len(updates) for _, updates in streams) / max(api.last - started, 1e-9), 2),
+        'users_per_shard': dict(sorted(collections.Counter(ring.shard(user_id) for user_id, _ in streams).items())),
+        'replies': sum(map(len, replies)),
+        'replies_per_chat': {'min': min(map(len, replies)), 'max': max(map(len, replies))},
+        'in_order': round(prefixes.most_common(1)[0][1] / len(replies), 4),
+        'front_rejections': dict(counters),
+        'api_calls': dict(api.calls),
+        'drains': drains
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the sharded bot on this box against a fake Bot API and LLM.')
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--paths', type=lambda value: value.split(','), default=list(PATHS))
+    parser.add_argument('--concurrency', type=int, default=50, help='users posting updates at the same time')
+    parser.add_argument('--latency', type=float, default=0.05, help='fake LLM latency, seconds')
+    parser.add_argument('--threshold', type=float, default=1.01, help='CLASSIFIER_THRESHOLD; above 1 always asks the LLM')
+    parser.add_argument('--settle', type=float, default=10.0, help='seconds without replies before stopping')
+    parser.add_argument('--stop-after', type=float, help='send SIGTERM this many seconds after posting starts, as a rolling deploy would')
+    parser.add_argument('--drain-timeout', type=float, default=25.0, help='DRAIN_TIMEOUT')
+    arguments = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(arguments)), indent=4))
+
+
+if __name__ == '__main__':
+    main()
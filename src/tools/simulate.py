@@ -0,0 +1,90 @@
+import argparse
+import dataclasses
+import json
+
+import numpy
+
+from core.services.pricing import PricingPolicy
+from core.services.simulation import OBJECTIONS, simulate
+
+
+COLUMNS = ('client_cpm', 'min_views', 'max_views', 'influencer_price')
+
+
+def load(path: str) -> dict:
+    if path.endswith('.parquet'):
+        import pyarrow.parquet
+
+        table = pyarrow.parquet.read_table(path)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+    with open(path, encoding='utf-8') as file:
+        header = [name.strip() for name in file.readline().split(',')]
+
+    columns = dict(zip(
+        COLUMNS,
+        numpy.loadtxt(path, delimiter=',', skiprows=1, usecols=[header.index(name) for name in COLUMNS], unpack=True, ndmin=2)
+    ))
+
+    if 'objection' in header:
+        columns['objection'] = numpy.loadtxt(path, delimiter=',', skiprows=1, usecols=header.index('objection'), dtype=str, ndmin=1)
+
+    return columns
+
+
+def policy_of(arguments, **overrides) -> PricingPolicy:
+    return PricingPolicy(**{
+        'cap_weight': arguments.cap_weight,
+        'cap_raise': arguments.cap_raise,
+        'cpm_raise': arguments.cpm_raise,
+        'fix_raises': tuple(arguments.fix_raises),
+        **overrides
+    })
+
+
+def sweep(value: str):
+    name, _, values = value.partition('=')
+
+    if name not in {field.name for field in dataclasses.fields(PricingPolicy)} or name == 'fix_raises':
+        raise argparse.ArgumentTypeError(f'cannot sweep {name}')
+
+    return name, [float(item) for item in values.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the pricing policy over a batch of deals.')
+    parser.add_argument('input', help=f'CSV or Parquet with {", ".join(COLUMNS)} and an optional objection column')
+    parser.add_argument('--objection', choices=OBJECTIONS, default='NO_CPM', help='reply to the first CPM offer when the input has none')
+    parser.add_argument('--cap-weight', type=float, default=3)
+    parser.add_argument('--cap-raise', type=float, default=1.3)
+    parser.add_argument('--cpm-raise', type=float, default=1.15)
+    parser.add_argument('--fix-raises', type=lambda value: [float(item) for item in value.split(',')], default=[1.0, 1.2, 1.3])
+    parser.add_argument('--sweep', type=sweep, help='one policy field and its values, e.g. cap_raise=1.2,1.3,1.4')
+    parser.add_argument('--output', help='CSV with the path and final price of every row, for the last policy evaluated')
+    arguments = parser.parse_args()
+
+    columns = load(arguments.input)
+    objection = columns.get('objection', arguments.objection)
+    name, values = arguments.sweep or (None, [None])
+    report = []
+
+    for value in values:
+        policy = policy_of(arguments, **({name: value} if name else {}))
+        result = simulate(*(columns[column] for column in COLUMNS), objection, policy)
+        report.append({**({name: value} if name else {}), **result.summary()})
+
+    if arguments.output:
+        numpy.savetxt(
+            arguments.output,
+            numpy.column_stack((result.paths(), result.price.round(2), result.success)),
+            fmt='%s',
+            delimiter=',',
+            header='path,price,success',
+            comments=''
+        )
+
+    print(json.dumps(report if name else report[0], indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import json
+import zlib
+
+from core.services.classifiers import KeywordClassifier, NaiveBayesClassifier
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        samples = [json.loads(line) for line in file if line.strip()]
+
+    return [sample for sample in samples if sample.get('label') in sample.get('labels', ())]
+
+
+def evaluate(classifier, samples, threshold):
+    confident = agreed = agreed_confident = 0
+
+    for sample in samples:
+        label, confidence = classifier.predict(sample['text'], sample['labels'])
+        agreed += label == sample['label']
+
+        if label is not None and confidence >= threshold:
+            confident += 1
+            agreed_confident += label == sample['label']
+
+    total = len(samples) or 1
+
+    return {
+        'samples': len(samples),
+        'agreement': agreed / total,
+        'coverage': confident / total,
+        'agreement_confident': agreed_confident / confident if confident else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and evaluate the local behaviour classifier against logged LLM labels.')
+    parser.add_argument('log', help='JSONL file written by Engine with CLASSIFIER_LOG_PATH')
+    parser.add_argument('--model', help='where to save the trained model (CLASSIFIER_MODEL_PATH)')
+    parser.add_argument('--holdout', type=float, default=0.2, help='fraction of samples kept for evaluation')
+    parser.add_argument('--threshold', type=float, default=0.9, help='confidence threshold (CLASSIFIER_THRESHOLD)')
+    arguments = parser.parse_args()
+
+    samples = load(arguments.log)
+    held, train = [], []
+
+    for sample in samples:
+        (held if zlib.crc32(sample['text'].encode()) % 100 < arguments.holdout * 100 else train).append(sample)
+
+    classifier = NaiveBayesClassifier().fit((sample['text'], sample['label']) for sample in train)
+
+    report = {
+        'train': len(train),
+        'keyword': evaluate(KeywordClassifier(), held, arguments.threshold),
+        'naive_bayes': evaluate(classifier, held, arguments.threshold)
+    }
+    print(json.dumps(report, indent=4))
+
+    if arguments.model:
+        NaiveBayesClassifier().fit((sample['text'], sample['label']) for sample in samples).save(arguments.model)
+
+
+if __name__ == '__main__':
+    main()